@@ -1,13 +1,39 @@
+import time
+
+INICIO_PROCESSO = time.perf_counter()
+
 import customtkinter as ctk
 import threading
+import multiprocessing
 import os
 import logging
 import tkinter.filedialog as filedialog
-import pystray
-from PIL import Image
-import time
-from storage_verificar import main
 from storage_settings import *
+from log_fila import LimitadorLog
+from progresso import CanalProgresso, formatar_eta
+from inicializacao import RelatorioInicializacao
+
+# pystray/PIL e o motor de verificação (openpyxl, dateutil, smtplib) só carregam depois da janela aparecer
+pystray = None
+Image = None
+main = None
+relatorio_inicio = RelatorioInicializacao(INICIO_PROCESSO, ORCAMENTO_INICIALIZACAO)
+relatorio_inicio.marcar("imports da interface")
+
+def carregar_bandeja():
+    global pystray, Image
+    if pystray is None:
+        with relatorio_inicio.medir("import pystray/PIL"):
+            import pystray as _pystray
+            from PIL import Image as _Image
+        pystray, Image = _pystray, _Image
+
+def carregar_motor():
+    global main
+    if main is None:
+        with relatorio_inicio.medir("import storage_verificar"):
+            from storage_verificar import main as _main
+        main = _main
 
 class BackupCheckerGUI(ctk.CTk):
     def __init__(self):
@@ -113,14 +139,36 @@ class BackupCheckerGUI(ctk.CTk):
 
         self.icon = None
         self.icon_running = False
-        self.setup_system_tray()
-        self.start_system_tray()
+        self.tray_lock = threading.Lock()
 
         self.protocol("WM_ICONIFY", self.minimize_to_tray)
         self.protocol("WM_DELETE_WINDOW", self.minimize_to_tray)
         self.pending_events = []
         self.stop_event = threading.Event()
         self.verification_thread = None
+        self.progress_channel = None
+        self.progress_poll_id = None
+        self.progress_log_limiter = LimitadorLog(PROGRESSO_LOG_INTERVALO)
+        self.after(0, self.on_window_shown)
+
+    def on_window_shown(self):
+        relatorio_inicio.marcar("janela visível")
+        threading.Thread(target=self.load_in_background, daemon=True).start()
+
+    def load_in_background(self):
+        try:
+            self.load_tray()
+            self.after(0, self.start_system_tray)
+            carregar_motor()
+        except Exception as e:
+            logging.error(f"Erro ao carregar componentes em segundo plano: {e}", exc_info=True)
+        relatorio_inicio.relatar("janela visível")
+
+    def load_tray(self):
+        with self.tray_lock:
+            if self.icon is None:
+                carregar_bandeja()
+                self.setup_system_tray()
 
     def optionmenu_callback(self, choice):
         logging.info(f"Opção selecionada: {choice}")
@@ -214,7 +262,7 @@ class BackupCheckerGUI(ctk.CTk):
         if self.icon_running:
             return
         try:
-            time.sleep(0.1)
+            self.load_tray()
             self.icon_running = True
             threading.Thread(target=self.icon.run, daemon=True).start()
         except Exception as e:
@@ -250,6 +298,9 @@ class BackupCheckerGUI(ctk.CTk):
                 except:
                     pass
             self.pending_events.clear()
+            if self.progress_poll_id is not None:
+                self.after_cancel(self.progress_poll_id)
+                self.progress_poll_id = None
             if self.verification_thread and self.verification_thread.is_alive():
                 self.verification_thread.join(timeout=2.0)
             if self.icon_running:
@@ -318,8 +369,35 @@ class BackupCheckerGUI(ctk.CTk):
         self.select_excel_button.pack_forget()  # Alterado de open_excel_button para select_excel_button
         self.optionmenu.configure(state="disabled")
         self.status_label.configure(text="Processando...")
-        self.verification_thread = threading.Thread(target=self.run_main, daemon=True)
+        self.progress_channel = CanalProgresso()
+        self.verification_thread = threading.Thread(
+            target=self.run_main, args=(excel_path, self.send_email_var.get()), daemon=True
+        )
         self.verification_thread.start()
+        self.progress_poll_id = self.after(PROGRESSO_GUI_INTERVALO, self.poll_progress)
+
+    def poll_progress(self):
+        # Drena o canal na thread do Tk; o worker nunca toca nos widgets
+        self.progress_poll_id = None
+        channel = self.progress_channel
+        if channel is None or self.stop_event.is_set():
+            return
+        estado = channel.drenar()
+        if estado is not None:
+            percent = int(estado.fracao * 100)
+            self.progressbar.set(estado.fracao)
+            self.progress_label.configure(text=f"{percent}%")
+            detalhes = f"{estado.pastas} pastas, {estado.arquivos} arquivos"
+            if estado.eta is not None:
+                detalhes += f" - restam ~{formatar_eta(estado.eta)}"
+            self.status_label.configure(text=f"Processando... {detalhes}")
+            if self.progress_log_limiter.permitir("progresso", forcar=estado.fracao >= 1.0):
+                logging.info(
+                    "Progresso atualizado",
+                    extra={"campos": {"progresso": f"{percent}%", "pastas": estado.pastas, "arquivos": estado.arquivos}},
+                )
+        if self.verification_thread and self.verification_thread.is_alive():
+            self.progress_poll_id = self.after(PROGRESSO_GUI_INTERVALO, self.poll_progress)
 
     def stop_verification(self):
         self.stop_event.set()
@@ -348,27 +426,19 @@ class BackupCheckerGUI(ctk.CTk):
             self.select_excel_button.configure(state="normal")
             self.verification_thread = None
 
-    def run_main(self):
-        def update_progress(target_value):
-            try:
-                target_value = max(0.0, min(1.0, target_value))
-                self.progressbar.set(target_value)
-                self.progress_label.configure(text=f"{int(target_value * 100)}%")
-                self.update()
-                logging.info(f"Progresso atualizado: {int(target_value * 100)}%")
-            except Exception as e:
-                logging.error(f"Erro ao atualizar progresso: {e}")
-
+    def run_main(self, excel_path, send_email):
+        carregar_motor()
         success = main(
-            excel_path=self.excel_path.get(),
-            send_email=self.send_email_var.get(),
+            excel_path=excel_path,
+            send_email=send_email,
             stop_event=self.stop_event,
-            progress_callback=update_progress,
+            progress_channel=self.progress_channel,
         )
         event_id = self.after(0, self.finish_verification, success)
         self.pending_events.append(event_id)
 
     def finish_verification(self, success):
+        self.progress_channel = None
         self.action_button.configure(
             text="Iniciar", command=self.start_verification, hover_color="#1E90FF"
         )
@@ -394,6 +464,8 @@ class BackupCheckerGUI(ctk.CTk):
             logging.error("Erro na verificação.")
 
 if __name__ == "__main__":
+    # Executável do PyInstaller: os processos da validação de backups reexecutam este arquivo
+    multiprocessing.freeze_support()
     ctk.set_appearance_mode("dark")
     ctk.set_default_color_theme("dark-blue")
     app = BackupCheckerGUI()
@@ -0,0 +1,162 @@
+import os
+import time
+import logging
+from collections import defaultdict, namedtuple
+import numpy as np
+from storage_settings import (
+    BACKUP_EXT,
+    ANALISE_JANELA,
+    ANALISE_MIN_AMOSTRAS,
+    ANALISE_LIMIAR_QUEDA,
+    ANALISE_LIMIAR_MAD,
+    ANALISE_TENDENCIA_QUEDA,
+)
+from storage_indice import obter_indice
+from storage_cache import obter_cache_varredura
+from metricas import obter_metricas
+
+QUEDA_BRUSCA = "queda brusca"
+FORA_DA_MEDIANA = "fora da mediana"
+SEM_CRESCIMENTO = "sem crescimento"
+
+MAD_NORMAL = 1.4826  # MAD -> desvio padrão em distribuição normal
+VARIACAO_MINIMA = 0.1  # piso da dispersão (10% da mediana) para históricos de tamanho constante
+SEGUNDOS_DIA = 86400
+
+# Série de uma TAG: um backup por semana (o mais recente), em ordem cronológica
+HistoricoTamanho = namedtuple("HistoricoTamanho", ["chave", "nomes", "mtimes", "tamanhos"])
+
+# referencia: tamanho de comparação (anterior, mediana móvel ou média da janela), em bytes
+AnomaliaTamanho = namedtuple(
+    "AnomaliaTamanho", ["aba", "tag", "responsavel", "setor", "tipo", "arquivo", "tamanho", "referencia"]
+)
+
+def semanas_locais(mtimes):
+    # Segunda-feira como início da semana; 01/01/1970 foi uma quinta
+    dias = np.floor((mtimes - time.timezone) / SEGUNDOS_DIA)
+    return (dias + 3) // 7
+
+def historico_semanal(chave, entradas):
+    # entradas: [(pasta, EntradaIndice)] de uma TAG; fica só o backup mais recente de cada semana
+    backups = [(pasta, e) for pasta, e in entradas if os.path.splitext(e.nome)[1].lower() in BACKUP_EXT]
+    if not backups:
+        return None
+    mtimes = np.fromiter((e.mtime for _, e in backups), dtype=np.float64, count=len(backups))
+    tamanhos = np.fromiter((e.tamanho for _, e in backups), dtype=np.float64, count=len(backups))
+    ordem = np.argsort(mtimes, kind="stable")
+    semanas = semanas_locais(mtimes[ordem])
+    ultimos = ordem[np.r_[semanas[1:] != semanas[:-1], True]]
+    return HistoricoTamanho(
+        chave,
+        [os.path.join(backups[i][0], backups[i][1].nome) for i in ultimos],
+        mtimes[ultimos],
+        tamanhos[ultimos],
+    )
+
+def conferir_mais_recente(entradas):
+    # O índice só revarre uma pasta quando o mtime dela muda: um backup listado no meio da cópia, ou
+    # sobrescrito no lugar, continua com o tamanho antigo. Um stat por TAG corrige o backup mais recente
+    backups = [(pasta, e) for pasta, e in entradas if os.path.splitext(e.nome)[1].lower() in BACKUP_EXT]
+    if not backups:
+        return entradas
+    pasta, entrada = max(backups, key=lambda item: item[1].mtime)
+    caminho = os.path.join(pasta, entrada.nome)
+    try:
+        stat = os.stat(caminho)
+    except FileNotFoundError:
+        return [item for item in entradas if item != (pasta, entrada)]
+    except OSError as e:
+        logging.warning(f"Não foi possível conferir o tamanho de {caminho}: {e}")
+        return entradas
+    if (stat.st_size, stat.st_mtime) == (entrada.tamanho, entrada.mtime):
+        return entradas
+    obter_indice().atualizar_entrada(pasta, entrada.nome, stat.st_mtime, stat.st_size)
+    obter_cache_varredura().invalidar_ancestrais(pasta)
+    logging.info(f"Índice desatualizado para {caminho}: {entrada.tamanho} -> {stat.st_size} bytes; entrada atualizada.")
+    atual = entrada._replace(mtime=stat.st_mtime, tamanho=stat.st_size)
+    return [(pasta, atual) if item == (pasta, entrada) else item for item in entradas]
+
+def coletar_historicos(abas):
+    # {(aba, tag, responsável, setor): HistoricoTamanho}, a partir do índice já preenchido pela varredura
+    indice = obter_indice()
+    historicos = {}
+    for aba in abas:
+        caminhos_por_tag = defaultdict(set)  # uma pasta da TAG por ano envolvido
+        for (_, setor, tag), caminho in aba.pastas_tag.items():
+            caminhos_por_tag[(setor, tag)].add(caminho)
+        for linha in aba.layout.linhas:
+            entradas = []
+            for caminho_tag in caminhos_por_tag.get((linha.setor, linha.tag), ()):
+                entradas.extend(indice.arquivos_sob(caminho_tag))
+            chave = (aba.nome, linha.tag, linha.responsavel, linha.setor)
+            historico = historico_semanal(chave, conferir_mais_recente(entradas))
+            if historico is not None and len(historico.tamanhos) > ANALISE_MIN_AMOSTRAS:
+                historicos[chave] = historico
+    return historicos
+
+def matriz_janela(historicos, janela=ANALISE_JANELA):
+    # Linhas = TAGs, colunas = semanas alinhadas à direita (última coluna = backup mais recente), NaN onde falta
+    matriz = np.full((len(historicos), janela + 1), np.nan)
+    for i, historico in enumerate(historicos):
+        cauda = historico.tamanhos[-(janela + 1):]
+        matriz[i, janela + 1 - len(cauda):] = cauda
+    return matriz
+
+def detectar_anomalias(historicos, janela=ANALISE_JANELA):
+    # Uma passada vetorizada sobre todas as TAGs; devolve [(índice, tipo, referência)]
+    if not historicos:
+        return []
+    matriz = matriz_janela(historicos, janela)
+    ultimo = matriz[:, -1]
+    anterior = matriz[:, -2]
+    passado = matriz[:, :-1]
+
+    # Queda brusca: último backup muito menor que o da semana anterior
+    queda = ultimo < anterior * ANALISE_LIMIAR_QUEDA
+
+    # Fora da mediana móvel das semanas anteriores, em MADs (com piso para séries constantes)
+    mediana = np.nanmedian(passado, axis=1)
+    mad = np.nanmedian(np.abs(passado - mediana[:, None]), axis=1)
+    escala = np.maximum(mad * MAD_NORMAL, mediana * VARIACAO_MINIMA)
+    fora = np.abs(ultimo - mediana) > ANALISE_LIMIAR_MAD * escala
+
+    # Sem crescimento: inclinação da reta de mínimos quadrados na janela, relativa à média
+    presentes = ~np.isnan(matriz)
+    valores = np.where(presentes, matriz, 0.0)
+    x = np.broadcast_to(np.arange(matriz.shape[1], dtype=np.float64), matriz.shape)
+    n = presentes.sum(axis=1)
+    media_x = (x * presentes).sum(axis=1) / n
+    media_y = valores.sum(axis=1) / n
+    dx = np.where(presentes, x - media_x[:, None], 0.0)
+    variancia = (dx * dx).sum(axis=1)
+    inclinacao = (dx * (valores - media_y[:, None])).sum(axis=1) / np.where(variancia > 0, variancia, 1.0)
+    relativa = inclinacao / np.where(media_y > 0, media_y, 1.0)
+    sem_crescimento = (n > ANALISE_MIN_AMOSTRAS) & (relativa < -ANALISE_TENDENCIA_QUEDA)
+
+    anomalias = []
+    for i in np.flatnonzero(queda):
+        anomalias.append((i, QUEDA_BRUSCA, anterior[i]))
+    for i in np.flatnonzero(fora & ~queda):
+        anomalias.append((i, FORA_DA_MEDIANA, mediana[i]))
+    for i in np.flatnonzero(sem_crescimento & ~queda & ~fora):
+        anomalias.append((i, SEM_CRESCIMENTO, media_y[i]))
+    return anomalias
+
+def analisar_abas(abas):
+    historicos = list(coletar_historicos(abas).values())
+    resultado = []
+    for i, tipo, referencia in detectar_anomalias(historicos):
+        historico = historicos[i]
+        aba, tag, responsavel, setor = historico.chave
+        resultado.append(AnomaliaTamanho(
+            aba, tag, responsavel, setor, tipo,
+            historico.nomes[-1], int(historico.tamanhos[-1]), int(referencia),
+        ))
+    obter_metricas().contar("anomalias_tamanho", len(resultado))
+    logging.info(f"Análise de tamanhos: {len(historicos)} TAG(s) com histórico, {len(resultado)} anomalia(s).")
+    for anomalia in resultado:
+        logging.warning(
+            f"Tamanho suspeito ({anomalia.tipo}) em {anomalia.tag}: {anomalia.arquivo} "
+            f"com {anomalia.tamanho} bytes (referência {anomalia.referencia} bytes)"
+        )
+    return resultado
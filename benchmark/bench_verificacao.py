@@ -0,0 +1,107 @@
+import openpyxl
+from datetime import datetime, timedelta
+from storage_verificar import (
+    PipelineVerificacao,
+    get_month_weeks,
+    gravar_alteracoes,
+    main,
+    planejar_aba,
+    verificar_aba,
+)
+from planilha_layout import TabelaPlanilha
+from storage_cache import obter_cache_varredura
+
+RODADAS = 3
+
+def semanas_a_verificar():
+    hoje = datetime.now()
+    return [semana for semana in get_month_weeks(hoje.year, hoje.month) if semana <= hoje.isocalendar()[1]]
+
+def meses_prioritarios():
+    inicio_semana = datetime.now() - timedelta(days=datetime.now().weekday())
+    return {inicio_semana.strftime("%m-%Y"), (inicio_semana + timedelta(days=6)).strftime("%m-%Y")}
+
+def ler_tabelas(caminho):
+    hoje = datetime.now()
+    wb = openpyxl.load_workbook(caminho, read_only=True)
+    try:
+        return [TabelaPlanilha.from_worksheet(wb[nome], hoje.year, hoje.month, nome=nome) for nome in wb.sheetnames]
+    finally:
+        wb.close()
+
+def varrer(tabelas):
+    semanas = semanas_a_verificar()
+    pipeline = PipelineVerificacao(meses_prioritarios=meses_prioritarios())
+    abas = [planejar_aba(tabela, semanas, pipeline) for tabela in tabelas]
+    for aba in abas:
+        pipeline.adicionar_aba(aba)
+    list(pipeline.abas_prontas(bloquear=True))
+    return pipeline, abas
+
+def casar(pipeline, abas):
+    alteracoes = []
+    resultados = []
+    for aba in abas:
+        verificar_aba(aba, pipeline, semanas_a_verificar(), datetime.now().year, alteracoes, resultados)
+    return alteracoes, resultados
+
+def test_leitura_planilha(benchmark, escala, storage):
+    _, copia_planilha = storage
+    caminho = copia_planilha()
+    tabelas = benchmark.pedantic(ler_tabelas, args=(caminho,), rounds=RODADAS)
+    assert tabelas
+
+def test_varredura_indice_frio(benchmark, escala, storage):
+    novo_indice, copia_planilha = storage
+    tabelas = ler_tabelas(copia_planilha())
+
+    def preparar():
+        novo_indice()
+        return (tabelas,), {}
+
+    benchmark.pedantic(varrer, setup=preparar, rounds=RODADAS)
+
+def test_varredura_indice_quente(benchmark, escala, storage):
+    novo_indice, copia_planilha = storage
+    tabelas = ler_tabelas(copia_planilha())
+    indice = novo_indice()
+    varrer(tabelas)
+
+    def preparar():
+        obter_cache_varredura().invalidar()
+        return (tabelas,), {}
+
+    benchmark.pedantic(varrer, setup=preparar, rounds=RODADAS)
+    assert indice.acertos > 0
+
+def test_correspondencia(benchmark, escala, storage):
+    novo_indice, copia_planilha = storage
+    caminho = copia_planilha()
+    novo_indice()
+
+    def preparar():
+        tabelas = ler_tabelas(caminho)
+        pipeline, abas = varrer(tabelas)
+        return (pipeline, abas), {}
+
+    alteracoes, _ = benchmark.pedantic(casar, setup=preparar, rounds=RODADAS)
+    assert alteracoes
+
+def test_gravacao(benchmark, escala, storage):
+    novo_indice, copia_planilha = storage
+    novo_indice()
+    alteracoes, _ = casar(*varrer(ler_tabelas(copia_planilha())))
+
+    def preparar():
+        return (copia_planilha(), alteracoes), {}
+
+    benchmark.pedantic(gravar_alteracoes, setup=preparar, rounds=RODADAS)
+
+def test_main_completo(benchmark, escala, storage):
+    novo_indice, copia_planilha = storage
+
+    def preparar():
+        novo_indice()
+        return (), {"excel_path": copia_planilha(), "send_email": False}
+
+    assert benchmark.pedantic(main, setup=preparar, rounds=RODADAS)
@@ -0,0 +1,78 @@
+import os
+import shutil
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import diario_verificacao
+import historico_resultados
+import metricas
+import storage_indice
+import storage_verificar
+from storage_cache import obter_cache_varredura
+from gerador import gerar_cenario
+
+# BENCH_ESCALAS=1,10,100 (padrão) e BENCH_LATENCIA_MS=5 para imitar o SMB em cada scandir/stat
+ESCALAS = [int(e) for e in os.getenv("BENCH_ESCALAS", "1,10,100").split(",") if e.strip()]
+LATENCIA = float(os.getenv("BENCH_LATENCIA_MS", "0")) / 1000
+
+def pytest_generate_tests(metafunc):
+    if "escala" in metafunc.fixturenames:
+        metafunc.parametrize("escala", ESCALAS, ids=[f"{e}x" for e in ESCALAS], scope="session")
+
+@pytest.fixture(scope="session")
+def cenario(escala, tmp_path_factory):
+    destino = tmp_path_factory.mktemp(f"cenario_{escala}x")
+    base, planilha, _ = gerar_cenario(str(destino), escala=escala)
+    return base, planilha
+
+@pytest.fixture
+def storage(cenario, monkeypatch, tmp_path):
+    base, planilha = cenario
+    monkeypatch.setattr(storage_verificar, "STORAGE_BASE", base)
+    # Histórico, métricas e checkpoints da execução ficam no tmp_path, não ao lado do código
+    monkeypatch.setattr(historico_resultados, "HISTORICO_DB_PATH", str(tmp_path / "historico_resultados.db"))
+    monkeypatch.setattr(metricas, "METRICAS_JSON_PATH", str(tmp_path / "metricas_execucao.json"))
+    monkeypatch.setattr(metricas, "METRICAS_PROM_PATH", str(tmp_path / "bkp_verificacao.prom"))
+    monkeypatch.setattr(diario_verificacao, "CHECKPOINT_DIR", str(tmp_path))
+    historico_resultados._historico = None
+    if LATENCIA:
+        scandir, stat = os.scandir, os.stat
+
+        def scandir_lento(caminho=".", *args, **kwargs):
+            if str(caminho).startswith(base):
+                time.sleep(LATENCIA)
+            return scandir(caminho, *args, **kwargs)
+
+        def stat_lento(caminho, *args, **kwargs):
+            if str(caminho).startswith(base):
+                time.sleep(LATENCIA)
+            return stat(caminho, *args, **kwargs)
+
+        monkeypatch.setattr(os, "scandir", scandir_lento)
+        monkeypatch.setattr(os, "stat", stat_lento)
+    indices = []
+
+    def novo_indice():
+        # Índice vazio (varredura fria) em um banco temporário
+        obter_cache_varredura().invalidar()
+        indice = storage_indice.IndiceStorage(str(tmp_path / f"indice_{len(indices)}.db"))
+        indices.append(indice)
+        storage_indice._indice = indice
+        return indice
+
+    def copia_planilha():
+        destino = tmp_path / f"planilha_{time.perf_counter_ns()}.xlsx"
+        shutil.copyfile(planilha, destino)
+        return str(destino)
+
+    yield novo_indice, copia_planilha
+    for indice in indices:
+        indice.close()
+    storage_indice._indice = None
+    if historico_resultados._historico is not None:
+        historico_resultados._historico.close()
+    historico_resultados._historico = None
+    obter_cache_varredura().invalidar()
@@ -0,0 +1,156 @@
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openpyxl
+from storage_settings import BACKUP_EXT
+
+MESES = [
+    "JANEIRO", "FEVEREIRO", "MARÇO", "ABRIL", "MAIO", "JUNHO",
+    "JULHO", "AGOSTO", "SETEMBRO", "OUTUBRO", "NOVEMBRO", "DEZEMBRO",
+]
+SETORES = ["CQ-MP", "PDI", "CFQ", "LAB/MICRO", "UTILIDADES"]
+RESPONSAVEIS = ["Alex", "Bia", "Carlos", "Duda", "Eduardo", "Filipe"]
+EXTENSOES_RUIDO = [".log", ".txt", ".tmp"]
+
+# Escala 1x: 2 abas com 10 TAGs cada
+ABAS_BASE = 2
+TAGS_POR_ABA_BASE = 10
+
+def semanas_do_ano(ano):
+    # Semanas ISO com o mês da quinta-feira, como nas colunas da planilha original
+    semanas = []
+    semana = 1
+    while True:
+        try:
+            inicio = date.fromisocalendar(ano, semana, 1)
+        except ValueError:
+            break
+        semanas.append((semana, inicio, inicio + timedelta(days=6), (inicio + timedelta(days=3)).month))
+        semana += 1
+    return semanas
+
+def montar_tags(escala=1, abas=ABAS_BASE, tags_por_aba=TAGS_POR_ABA_BASE, semente=0):
+    aleatorio = random.Random(semente)
+    por_aba = max(1, tags_por_aba * escala)
+    tags = []
+    for i in range(max(1, abas)):
+        responsavel = RESPONSAVEIS[i % len(RESPONSAVEIS)] + ("" if i < len(RESPONSAVEIS) else f" {i}")
+        for j in range(por_aba):
+            tags.append((responsavel, f"EQP {i + 1:02d}-{j + 1:04d}", aleatorio.choice(SETORES)))
+    return tags
+
+def _tocar(caminho, mtime, tamanho):
+    with open(caminho, "wb") as arquivo:
+        arquivo.truncate(tamanho)
+    os.utime(caminho, (mtime, mtime))
+
+def gerar_storage(
+    base,
+    tags,
+    data_referencia=None,
+    meses_historico=3,
+    arquivos_por_semana=1,
+    proporcao_ausentes=0.2,
+    arquivos_ruido=1,
+    tamanho=1024,
+    semente=0,
+):
+    # <base>/<ano>/<setor>/<tag>/<MM-YYYY>/ com um backup por semana (alguns em subpastas) e arquivos de ruído
+    data_referencia = data_referencia or date.today()
+    aleatorio = random.Random(semente)
+    inicio = (data_referencia.replace(day=1) - timedelta(days=31 * meses_historico)).replace(day=1)
+    total = 0
+    for _, tag, setor in tags:
+        dia = inicio - timedelta(days=inicio.weekday())
+        while dia <= data_referencia:
+            faltando = aleatorio.random() < proporcao_ausentes
+            for n in range(0 if faltando else arquivos_por_semana):
+                momento = datetime.combine(
+                    min(dia + timedelta(days=aleatorio.randint(0, 6)), data_referencia),
+                    datetime.min.time(),
+                ) + timedelta(hours=aleatorio.randint(0, 23), minutes=aleatorio.randint(0, 59))
+                if momento.date() < inicio:
+                    continue
+                pasta = os.path.join(base, str(momento.year), *setor.split("/"), tag, momento.strftime("%m-%Y"))
+                if aleatorio.random() < 0.3:
+                    pasta = os.path.join(pasta, f"bkp {momento:%d}")
+                os.makedirs(pasta, exist_ok=True)
+                mtime = time.mktime(momento.timetuple())
+                extensao = BACKUP_EXT[(total + n) % len(BACKUP_EXT)]
+                _tocar(os.path.join(pasta, f"{tag} {momento:%Y%m%d-%H%M}{extensao}"), mtime, tamanho)
+                for r in range(arquivos_ruido):
+                    _tocar(os.path.join(pasta, f"{tag} {momento:%Y%m%d-%H%M}-{r}{EXTENSOES_RUIDO[r % len(EXTENSOES_RUIDO)]}"), mtime, 0)
+                total += 1
+            dia += timedelta(days=7)
+    return total
+
+def gerar_planilha(caminho, tags, data_referencia=None):
+    # Mesmo layout da "Acompanhamento de Backups": meses, "Nª SEMANA", "DIA a - b" e dados a partir da linha 4
+    data_referencia = data_referencia or date.today()
+    ano = data_referencia.year
+    semanas = semanas_do_ano(ano)
+    inicio_mes = data_referencia.replace(day=1)
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    por_aba = {}
+    for responsavel, tag, setor in tags:
+        por_aba.setdefault(responsavel, []).append((tag, setor))
+    for responsavel, linhas in por_aba.items():
+        ws = wb.create_sheet(responsavel[:31])
+        for coluna, cabecalho in enumerate(["TAG", "RESPONSÁVEL", "SETOR", "TIPO", "LOCAL BKP"], start=1):
+            ws.cell(3, coluna, cabecalho)
+        mes_anterior = None
+        for i, (semana, inicio, fim, mes) in enumerate(semanas):
+            coluna = 6 + i
+            if mes != mes_anterior:
+                ws.cell(1, coluna, MESES[mes - 1])
+                mes_anterior = mes
+            ws.cell(2, coluna, f"{semana}ª SEMANA")
+            ws.cell(3, coluna, f"DIA {inicio.day} - {fim.day}")
+        for linha, (tag, setor) in enumerate(linhas, start=4):
+            ws.cell(linha, 1, tag)
+            ws.cell(linha, 2, responsavel.upper())
+            ws.cell(linha, 3, setor)
+            ws.cell(linha, 4, "AUTOMATICO")
+            ws.cell(linha, 5, "STORAGE")
+            # Semanas de meses anteriores já preenchidas; o mês de referência fica para a verificação
+            for i, (semana, inicio, fim, mes) in enumerate(semanas):
+                if inicio + timedelta(days=3) >= inicio_mes:
+                    break
+                ws.cell(linha, 6 + i, datetime.combine(inicio + timedelta(days=3), datetime.min.time()))
+    wb.save(caminho)
+    return caminho
+
+def gerar_cenario(destino, escala=1, data_referencia=None, semente=0, **kwargs):
+    base = os.path.join(destino, "storage")
+    planilha = os.path.join(destino, "Acompanhamento de Backups.xlsx")
+    tags = montar_tags(escala, semente=semente)
+    total = gerar_storage(base, tags, data_referencia=data_referencia, semente=semente, **kwargs)
+    gerar_planilha(planilha, tags, data_referencia=data_referencia)
+    return base, planilha, total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera storage e planilha sintéticos para benchmark.")
+    parser.add_argument("destino")
+    parser.add_argument("--escala", type=int, default=1)
+    parser.add_argument("--meses-historico", type=int, default=3)
+    parser.add_argument("--arquivos-por-semana", type=int, default=1)
+    parser.add_argument("--proporcao-ausentes", type=float, default=0.2)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+    base, planilha, total = gerar_cenario(
+        args.destino,
+        escala=args.escala,
+        semente=args.semente,
+        meses_historico=args.meses_historico,
+        arquivos_por_semana=args.arquivos_por_semana,
+        proporcao_ausentes=args.proporcao_ausentes,
+    )
+    print(f"Storage: {base} ({total} backups)")
+    print(f"Planilha: {planilha}")
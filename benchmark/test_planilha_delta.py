@@ -0,0 +1,127 @@
+import glob
+import os
+import re
+import shutil
+import sys
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import openpyxl
+import pytest
+from planilha_delta import ErroDelta, gravar_alteracoes_delta, _partes_das_abas
+from planilha_escrita import gravar_alteracoes, gravar_alteracoes_openpyxl
+from planilha_estilos import aparencia
+from planilha_layout import AlteracaoCelula, STATUS_OK, STATUS_NAO_ENCONTRADO, STATUS_CORROMPIDO
+
+PASTA_EXCEL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "excel")
+PLANILHAS = sorted(p for p in glob.glob(os.path.join(PASTA_EXCEL, "*.xlsx")) if not os.path.basename(p).startswith("~$"))
+STATUS = [STATUS_OK, STATUS_NAO_ENCONTRADO, STATUS_CORROMPIDO]
+
+def linhas_no_xml(caminho):
+    # {aba: [números de linha presentes no sheetData]}, para achar lacunas entre linhas existentes
+    with zipfile.ZipFile(caminho) as z:
+        return {
+            aba: sorted(int(n) for n in re.findall(r'<row\b[^>]*?\br="(\d+)"', z.read(parte).decode("utf-8")))
+            for aba, parte in _partes_das_abas(z).items()
+        }
+
+def montar_alteracoes(caminho):
+    # Por aba: células existentes (com e sem valor), célula nova em linha existente, linhas entre
+    # linhas existentes e uma linha nova depois da última
+    alteracoes = []
+    for aba, linhas in linhas_no_xml(caminho).items():
+        if not linhas:
+            continue
+        presentes = set(linhas)
+        lacunas = [n for n in range(linhas[0], linhas[-1]) if n not in presentes][:2]
+        celulas = [(4, 6), (4, 7), (5, 8), (6, 60)]
+        celulas += [(linha, 7) for linha in lacunas]
+        celulas += [(linhas[-1] + 3, 6), (linhas[-1] + 3, 8)]
+        for i, (linha, coluna) in enumerate(celulas):
+            status = STATUS[i % len(STATUS)]
+            valor = "20/10/2025" if status == STATUS_OK else status
+            alteracoes.append(AlteracaoCelula(aba, linha, coluna, valor, status))
+    return alteracoes
+
+def valores(caminho):
+    # O openpyxl não grava células com texto vazio; o delta preserva as células que não alterou
+    wb = openpyxl.load_workbook(caminho)
+    try:
+        return {
+            ws.title: [[None if valor == "" else valor for valor in linha] for linha in ws.iter_rows(values_only=True)]
+            for ws in wb
+        }
+    finally:
+        wb.close()
+
+def formato(celula):
+    borda = celula.border
+    return (
+        borda.left.style, borda.right.style, borda.top.style, borda.bottom.style,
+        celula.number_format,
+    )
+
+def aparencia_gravada(celula):
+    return (
+        celula.fill.fill_type, (celula.fill.fgColor.rgb or "")[-6:],
+        (celula.font.color.rgb if celula.font.color is not None else "")[-6:], bool(celula.font.b),
+        celula.alignment.horizontal, celula.alignment.vertical,
+    )
+
+def aparencia_esperada(status):
+    _, cor_fill, cor_fonte, negrito = aparencia(status)
+    return ("solid", cor_fill, cor_fonte, negrito, "center", "center")
+
+def conferir(original, caminho, alteracoes):
+    wb_original = openpyxl.load_workbook(original)
+    wb = openpyxl.load_workbook(caminho)
+    try:
+        for alteracao in alteracoes:
+            celula = wb[alteracao.aba].cell(row=alteracao.linha, column=alteracao.coluna)
+            antes = wb_original[alteracao.aba].cell(row=alteracao.linha, column=alteracao.coluna)
+            assert celula.value == alteracao.valor, celula.coordinate
+            assert aparencia_gravada(celula) == aparencia_esperada(alteracao.status), celula.coordinate
+            assert formato(celula) == formato(antes), celula.coordinate
+    finally:
+        wb_original.close()
+        wb.close()
+
+@pytest.mark.parametrize("planilha", PLANILHAS, ids=os.path.basename)
+def test_delta_igual_ao_openpyxl(planilha, tmp_path):
+    alteracoes = montar_alteracoes(planilha)
+    delta = str(tmp_path / "delta.xlsx")
+    completa = str(tmp_path / "openpyxl.xlsx")
+    shutil.copy(planilha, delta)
+    shutil.copy(planilha, completa)
+
+    gravar_alteracoes_delta(delta, alteracoes)
+    gravar_alteracoes_openpyxl(completa, alteracoes)
+
+    with zipfile.ZipFile(delta) as z:
+        assert z.testzip() is None
+    assert valores(delta) == valores(completa)
+    conferir(planilha, delta, alteracoes)
+    conferir(planilha, completa, alteracoes)
+
+def test_celula_com_formula_usa_openpyxl(tmp_path):
+    original = str(tmp_path / "original.xlsx")
+    caminho = str(tmp_path / "formula.xlsx")
+    wb = openpyxl.load_workbook(PLANILHAS[0])
+    aba = wb.sheetnames[0]
+    wb[aba].cell(row=4, column=6).value = "=1+1"
+    wb.save(original)
+    wb.close()
+    shutil.copy(original, caminho)
+    alteracoes = [
+        AlteracaoCelula(aba, 4, 6, STATUS_NAO_ENCONTRADO, STATUS_NAO_ENCONTRADO),
+        AlteracaoCelula(aba, 5, 6, "20/10/2025", STATUS_OK),
+    ]
+
+    with pytest.raises(ErroDelta):
+        gravar_alteracoes_delta(caminho, alteracoes)
+    gravar_alteracoes(caminho, alteracoes)
+
+    with zipfile.ZipFile(caminho) as z:
+        assert z.testzip() is None
+    conferir(original, caminho, alteracoes)
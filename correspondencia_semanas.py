@@ -0,0 +1,48 @@
+import time
+from datetime import date, timedelta
+import numpy as np
+
+def _timestamp_local(dia):
+    # Meia-noite local do dia, no mesmo referencial de datetime.fromtimestamp(mtime)
+    return time.mktime((dia.year, dia.month, dia.day, 0, 0, 0, 0, 0, -1))
+
+def limites_intervalos(intervalos_por_semana, ano=None):
+    semanas = list(intervalos_por_semana)
+    inicios = np.empty(len(semanas))
+    fins = np.empty(len(semanas))
+    for i, semana in enumerate(semanas):
+        data_inicio, data_fim = intervalos_por_semana[semana]
+        if ano is not None:
+            data_inicio = max(data_inicio, date(ano, 1, 1))
+            data_fim = min(data_fim, date(ano, 12, 31))
+        inicios[i] = _timestamp_local(data_inicio)
+        fins[i] = _timestamp_local(data_fim + timedelta(days=1))
+    return semanas, inicios, fins
+
+def mais_recente_por_semana(arquivos_por_linha, intervalos_por_semana, ano=None):
+    # Devolve {(linha, semana): ArquivoBackup} com o arquivo mais recente de cada intervalo [início, fim]
+    linhas = [linha for linha, arquivos in arquivos_por_linha.items() if arquivos]
+    if not linhas or not intervalos_por_semana:
+        return {}
+    arquivos = [arquivo for linha in linhas for arquivo in arquivos_por_linha[linha]]
+    mtimes = np.fromiter((arquivo.mtime for arquivo in arquivos), dtype=np.float64, count=len(arquivos))
+    rank_linha = np.repeat(np.arange(len(linhas)), [len(arquivos_por_linha[linha]) for linha in linhas])
+    semanas, inicios, fins = limites_intervalos(intervalos_por_semana, ano)
+
+    # Chave composta linha * faixa + mtime: um único searchsorted cobre todas as (linha, semana)
+    base = min(mtimes.min(), inicios.min())
+    faixa = max(mtimes.max(), fins.max()) - base + 1.0
+    chaves = rank_linha * faixa + (mtimes - base)
+    ordem = np.argsort(chaves, kind="stable")
+    chaves = chaves[ordem]
+
+    deslocamento = np.arange(len(linhas))[:, None] * faixa
+    lo = np.searchsorted(chaves, deslocamento + (inicios - base)[None, :], side="left")
+    hi = np.searchsorted(chaves, deslocamento + (fins - base)[None, :], side="left")
+    vazios = (fins <= inicios)[None, :]
+    encontrados = (hi > lo) & ~vazios
+
+    resultado = {}
+    for i, j in zip(*np.nonzero(encontrados)):
+        resultado[(linhas[i], semanas[j])] = arquivos[ordem[hi[i, j] - 1]]
+    return resultado
@@ -0,0 +1,127 @@
+import json
+import logging
+import os
+import threading
+from datetime import date
+from storage_settings import CHECKPOINT_DIR
+from planilha_layout import AlteracaoCelula, STATUS_REVERIFICAVEIS
+
+def caminho_diario(caminho_planilha, diretorio=None):
+    diretorio = diretorio or CHECKPOINT_DIR
+    nome = os.path.splitext(os.path.basename(caminho_planilha))[0]
+    return os.path.join(diretorio, f"checkpoint_{nome}.jsonl")
+
+class DiarioVerificacao:
+    # JSONL só de acréscimos: cabeçalho, pastas varridas e células decididas; vale apenas no mesmo dia
+    def __init__(self, caminho_planilha, dia=None, caminho=None):
+        self.planilha = os.path.abspath(caminho_planilha)
+        self.dia = (dia or date.today()).isoformat()
+        self.caminho = caminho or caminho_diario(caminho_planilha)
+        self.lock = threading.Lock()
+        self.pastas = {}  # (caminho_tag, mes_ano) -> [[caminho, nome, mtime, tamanho]]
+        self.celulas = {}  # (aba, linha, coluna) -> AlteracaoCelula
+        self.arquivo = None
+
+    def abrir(self):
+        # Retoma um diário compatível ou começa um novo; linhas truncadas por queda são ignoradas
+        if os.path.exists(self.caminho) and self._carregar():
+            logging.info(
+                f"Retomando verificação de {self.caminho}: {len(self.pastas)} pasta(s) e {len(self.celulas)} célula(s) já concluídas."
+            )
+            self.arquivo = open(self.caminho, "a", encoding="utf-8")
+        else:
+            self.pastas.clear()
+            self.celulas.clear()
+            self.arquivo = open(self.caminho, "w", encoding="utf-8")
+            self._escrever({"tipo": "inicio", "planilha": self.planilha, "dia": self.dia}, sincronizar=True)
+        return self
+
+    def _carregar(self):
+        try:
+            with open(self.caminho, encoding="utf-8") as arquivo:
+                linhas = arquivo.readlines()
+        except OSError as e:
+            logging.warning(f"Erro ao ler o diário {self.caminho}: {e}")
+            return False
+        registros = []
+        for linha in linhas:
+            try:
+                registros.append(json.loads(linha))
+            except ValueError:
+                continue
+        if not registros or registros[0].get("tipo") != "inicio":
+            return False
+        if registros[0].get("planilha") != self.planilha or registros[0].get("dia") != self.dia:
+            logging.info(f"Diário {self.caminho} de outra planilha ou dia, descartado.")
+            return False
+        for registro in registros[1:]:
+            if registro.get("tipo") == "pasta":
+                self.pastas[(registro["caminho_tag"], registro["mes_ano"])] = registro["arquivos"]
+            elif registro.get("tipo") == "celula":
+                alteracao = AlteracaoCelula(
+                    registro["aba"], registro["linha"], registro["coluna"], registro["valor"], registro["status"]
+                )
+                self.celulas[(alteracao.aba, alteracao.linha, alteracao.coluna)] = alteracao
+        return True
+
+    def _escrever(self, registro, sincronizar=False):
+        self.arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self.arquivo.flush()
+        if sincronizar:
+            os.fsync(self.arquivo.fileno())
+
+    def pastas_concluidas(self, tipo_arquivo):
+        with self.lock:
+            return {chave: [tipo_arquivo(*arquivo) for arquivo in arquivos] for chave, arquivos in self.pastas.items()}
+
+    def registrar_pastas(self, caminho_tag, resultado):
+        with self.lock:
+            if self.arquivo is None:
+                return
+            for mes_ano, arquivos in resultado.items():
+                registro = [list(arquivo) for arquivo in arquivos]
+                self.pastas[(caminho_tag, mes_ano)] = registro
+                self._escrever({"tipo": "pasta", "caminho_tag": caminho_tag, "mes_ano": mes_ano, "arquivos": registro})
+
+    def registrar_celulas(self, alteracoes):
+        with self.lock:
+            if self.arquivo is None:
+                return
+            for alteracao in alteracoes:
+                self.celulas[(alteracao.aba, alteracao.linha, alteracao.coluna)] = alteracao
+                self._escrever({"tipo": "celula", **alteracao._asdict()})
+            os.fsync(self.arquivo.fileno())
+
+    def aplicar(self, tabela, alteracoes):
+        # Datas já encontradas voltam para a tabela e para a gravação; NOT FOUND/CORROMPIDO são decididos de novo
+        for (aba, linha, coluna), alteracao in self.celulas.items():
+            if aba != tabela.nome or alteracao.valor in STATUS_REVERIFICAVEIS:
+                continue
+            if linha not in tabela.posicao or coluna not in tabela.valores:
+                continue
+            valor_atual = tabela.valor(linha, coluna)
+            if valor_atual is not None and valor_atual not in STATUS_REVERIFICAVEIS:
+                continue
+            tabela.definir(linha, coluna, alteracao.valor)
+            alteracoes.append(alteracao)
+
+    def pendentes(self):
+        with self.lock:
+            return list(self.celulas.values())
+
+    def fechar(self):
+        with self.lock:
+            if self.arquivo is not None:
+                self.arquivo.close()
+                self.arquivo = None
+
+    def concluir(self):
+        # Gravação final feita: o diário não é mais necessário
+        self.fechar()
+        with self.lock:
+            self.pastas.clear()
+            self.celulas.clear()
+        try:
+            os.remove(self.caminho)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from collections import defaultdict
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from storage_settings import (
+    smtp_server,
+    smtp_port,
+    smtp_user,
+    smtp_pass,
+    smtp_starttls,
+    from_email,
+    to_email,
+    enviar_consolidado,
+    DESTINATARIOS_PATH,
+    SMTP_MAX_CONEXOES,
+    SMTP_MAX_TENTATIVAS,
+    SMTP_BACKOFF,
+)
+from relatorio_email import renderizar_relatorio_html
+from metricas import obter_metricas
+
+ASSUNTO = "Relatório de Backups Ausentes"
+
+# Falhas que justificam reconectar e tentar de novo: respostas 4xx do servidor, queda da conexão e rede.
+# Respostas 5xx (ex.: 550 em SMTPDataError, SMTPSenderRefused) são definitivas
+ERROS_TRANSITORIOS = (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError)
+
+def transitorio(erro):
+    if isinstance(erro, smtplib.SMTPResponseException):
+        return erro.smtp_code < 500
+    return True
+
+def enderecos(valor):
+    if not valor:
+        return []
+    if isinstance(valor, str):
+        valor = valor.split(",")
+    return [endereco.strip() for endereco in valor if endereco and endereco.strip()]
+
+def carregar_destinatarios(caminho=DESTINATARIOS_PATH):
+    if not os.path.exists(caminho):
+        return {}
+    try:
+        with open(caminho, encoding="utf-8") as arquivo:
+            mapa = json.load(arquivo)
+    except (OSError, ValueError) as e:
+        logging.error(f"Erro ao ler destinatários {caminho}: {e}")
+        return {}
+    return {str(chave).strip().casefold(): enderecos(valor) for chave, valor in mapa.items()}
+
+def montar_mensagem(destinatarios, faltantes, assunto=ASSUNTO, anomalias=None):
+    msg = MIMEMultipart()
+    msg["From"] = from_email
+    msg["To"] = ", ".join(destinatarios)
+    msg["Subject"] = assunto
+    msg.attach(MIMEText(renderizar_relatorio_html(faltantes, anomalias), "html"))
+    return msg
+
+def montar_mensagens(faltantes, destinatarios=None, anomalias=None):
+    # Um resumo por endereço com apenas as linhas do responsável/setor dele, mais o consolidado em TO_EMAIL
+    destinatarios = carregar_destinatarios() if destinatarios is None else destinatarios
+    anomalias = anomalias or {}
+    por_endereco = defaultdict(lambda: ({}, {}))
+    sem_destinatario = ({}, {})
+    for grupo, por_tag in enumerate((faltantes, anomalias)):
+        for chave, itens in por_tag.items():
+            _, _, responsavel, setor = chave
+            alvos = set()
+            for nome in (responsavel, setor):
+                alvos.update(destinatarios.get(str(nome).strip().casefold(), []))
+            if not alvos:
+                sem_destinatario[grupo][chave] = itens
+            for endereco in alvos:
+                por_endereco[endereco][grupo][chave] = itens
+    mensagens = []
+    for endereco, (itens, itens_tamanho) in por_endereco.items():
+        responsaveis = sorted({str(responsavel) for _, _, responsavel, _ in (*itens, *itens_tamanho)})
+        mensagens.append(
+            montar_mensagem([endereco], itens, f"{ASSUNTO} - {', '.join(responsaveis)}", itens_tamanho)
+        )
+    consolidado = (faltantes, anomalias) if enviar_consolidado else sem_destinatario
+    if (consolidado[0] or consolidado[1]) and enderecos(to_email):
+        mensagens.append(montar_mensagem(enderecos(to_email), consolidado[0], anomalias=consolidado[1]))
+    return mensagens
+
+class EntregadorSMTP:
+    def __init__(
+        self,
+        servidor=smtp_server,
+        porta=smtp_port,
+        usuario=smtp_user,
+        senha=smtp_pass,
+        starttls=smtp_starttls,
+        max_conexoes=SMTP_MAX_CONEXOES,
+        max_tentativas=SMTP_MAX_TENTATIVAS,
+        backoff=SMTP_BACKOFF,
+        stop_event=None,
+    ):
+        self.servidor = servidor
+        self.porta = porta
+        self.usuario = usuario
+        self.senha = senha
+        self.starttls = starttls
+        self.max_conexoes = max_conexoes
+        self.max_tentativas = max_tentativas
+        self.backoff = backoff
+        self.stop_event = stop_event
+        self.abortar = threading.Event()
+        self.lock = threading.Lock()
+        self.enviadas = 0
+        self.falhas = 0
+
+    def conectar(self):
+        conexao = smtplib.SMTP(self.servidor, self.porta, timeout=30)
+        if self.starttls:
+            conexao.starttls()
+        if self.usuario:
+            conexao.login(self.usuario, self.senha)
+        return conexao
+
+    def _fechar(self, conexao):
+        if conexao is None:
+            return
+        try:
+            conexao.quit()
+        except Exception:
+            conexao.close()
+
+    def _interrompido(self):
+        return self.abortar.is_set() or (self.stop_event is not None and self.stop_event.is_set())
+
+    def _entregar(self, conexao, msg):
+        for tentativa in range(self.max_tentativas):
+            if self._interrompido():
+                return conexao, False
+            try:
+                if conexao is None:
+                    conexao = self.conectar()
+                conexao.send_message(msg)
+                return conexao, True
+            except smtplib.SMTPAuthenticationError:
+                logging.error("Erro: Falha na autenticação. Verifique usuário e senha.")
+                self.abortar.set()
+                return conexao, False
+            except smtplib.SMTPRecipientsRefused as e:
+                logging.error(f"Destinatários recusados para '{msg['Subject']}': {e.recipients}")
+                return conexao, False
+            except ERROS_TRANSITORIOS as e:
+                if not transitorio(e):
+                    logging.error(f"Envio para {msg['To']} recusado pelo servidor: {e}")
+                    return conexao, False
+                self._fechar(conexao)
+                conexao = None
+                if tentativa == self.max_tentativas - 1:
+                    logging.error(f"Erro ao enviar email para {msg['To']}: {e}")
+                    return conexao, False
+                espera = self.backoff * 2 ** tentativa
+                logging.warning(
+                    f"Tentativa {tentativa + 1} de envio para {msg['To']} falhou. Tentando novamente em {espera} segundos: {e}"
+                )
+                obter_metricas().contar("retentativas_smtp")
+                time.sleep(espera)
+        return conexao, False
+
+    def _worker(self, fila):
+        conexao = None
+        try:
+            while not self._interrompido():
+                try:
+                    msg = fila.get_nowait()
+                except queue.Empty:
+                    return
+                conexao, ok = self._entregar(conexao, msg)
+                with self.lock:
+                    if ok:
+                        self.enviadas += 1
+                    else:
+                        self.falhas += 1
+        finally:
+            self._fechar(conexao)
+
+    def enviar(self, mensagens):
+        fila = queue.Queue()
+        for msg in mensagens:
+            fila.put(msg)
+        threads = [
+            threading.Thread(target=self._worker, args=(fila,), name=f"smtp-{i + 1}", daemon=True)
+            for i in range(max(1, min(self.max_conexoes, len(mensagens))))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        obter_metricas().contar("emails_enviados", self.enviadas)
+        logging.info(f"E-mails enviados: {self.enviadas}, falhas: {self.falhas + fila.qsize()}")
+        return self.enviadas == len(mensagens)
+
+def enviar_relatorios(faltantes, stop_event=None, anomalias=None):
+    mensagens = montar_mensagens(faltantes, anomalias=anomalias)
+    if not mensagens:
+        logging.error("Nenhum destinatário configurado para o relatório (TO_EMAIL/destinatarios.json).")
+        return False
+    return EntregadorSMTP(stop_event=stop_event).enviar(mensagens)
@@ -0,0 +1,230 @@
+import argparse
+import logging
+import os
+import pathlib
+import sqlite3
+import sys
+import threading
+from datetime import date, datetime
+from storage_settings import HISTORICO_DB_PATH
+from planilha_layout import STATUS_REVERIFICAVEIS
+from metricas import obter_metricas
+
+_historico = None
+_historico_lock = threading.Lock()
+
+# resultados: uma linha por (execução, célula), só acrescentada
+# situacao_atual: último resultado de cada célula (planilha, aba, TAG, semana), para as consultas
+# não varrerem o histórico inteiro
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS execucoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    planilha TEXT NOT NULL,
+    executada_em TEXT NOT NULL,
+    resultados INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS resultados (
+    execucao INTEGER NOT NULL,
+    planilha TEXT NOT NULL,
+    aba TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    setor TEXT,
+    responsavel TEXT,
+    semana INTEGER NOT NULL,
+    inicio TEXT NOT NULL,
+    fim TEXT NOT NULL,
+    status TEXT NOT NULL,
+    arquivo TEXT,
+    mtime REAL,
+    tamanho INTEGER
+);
+CREATE INDEX IF NOT EXISTS resultados_tag ON resultados (tag, inicio);
+CREATE TABLE IF NOT EXISTS situacao_atual (
+    planilha TEXT NOT NULL,
+    aba TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    setor TEXT,
+    responsavel TEXT,
+    semana INTEGER NOT NULL,
+    inicio TEXT NOT NULL,
+    fim TEXT NOT NULL,
+    status TEXT NOT NULL,
+    arquivo TEXT,
+    mtime REAL,
+    tamanho INTEGER,
+    execucao INTEGER NOT NULL,
+    PRIMARY KEY (planilha, aba, tag, semana)
+);
+CREATE INDEX IF NOT EXISTS situacao_periodo ON situacao_atual (fim, status);
+"""
+
+COLUNAS = "planilha, aba, tag, setor, responsavel, semana, inicio, fim, status, arquivo, mtime, tamanho"
+
+def linha_resultado(planilha, resultado):
+    data_inicio, data_fim = resultado.intervalo
+    arquivo = resultado.arquivo
+    return (
+        planilha, resultado.aba, str(resultado.tag), resultado.setor, resultado.responsavel, resultado.semana,
+        data_inicio.isoformat(), data_fim.isoformat(), resultado.status,
+        arquivo.caminho if arquivo else None,
+        arquivo.mtime if arquivo else None,
+        arquivo.tamanho if arquivo else None,
+    )
+
+def trimestre(dia):
+    mes_inicial = 3 * ((dia.month - 1) // 3) + 1
+    inicio = date(dia.year, mes_inicial, 1)
+    fim = date(dia.year + 1, 1, 1) if mes_inicial == 10 else date(dia.year, mes_inicial + 3, 1)
+    return inicio, date.fromordinal(fim.toordinal() - 1)
+
+class HistoricoResultados:
+    def __init__(self, caminho_db=None, somente_leitura=False):
+        caminho_db = caminho_db or HISTORICO_DB_PATH
+        self.caminho_db = caminho_db
+        self.lock = threading.Lock()
+        if somente_leitura:
+            # Painéis e a CLI leem sem bloquear a gravação (WAL) e sem criar o arquivo
+            uri = f"{pathlib.Path(caminho_db).resolve().as_uri()}?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+        self.conn = sqlite3.connect(caminho_db, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrar_situacao()
+        self.conn.executescript(ESQUEMA)
+        self.conn.commit()
+
+    def _migrar_situacao(self):
+        # Versão anterior indexava a situação pela data de início; refaz a tabela a partir de `resultados`
+        chave = [linha[1] for linha in self.conn.execute("PRAGMA table_info(situacao_atual)") if linha[5]]
+        if "inicio" not in chave:
+            return
+        with self.conn:
+            self.conn.execute("DROP TABLE situacao_atual")
+            self.conn.executescript(ESQUEMA)
+            self.conn.execute(
+                f"""
+                INSERT INTO situacao_atual ({COLUNAS}, execucao)
+                SELECT {COLUNAS}, MAX(execucao) FROM resultados GROUP BY planilha, aba, tag, semana
+                """
+            )
+        logging.info("Histórico: situação atual reindexada por semana.")
+
+    def registrar(self, planilha, resultados):
+        linhas = [linha_resultado(planilha, resultado) for resultado in resultados]
+        with self.lock, self.conn:
+            execucao = self.conn.execute(
+                "INSERT INTO execucoes (planilha, executada_em, resultados) VALUES (?, ?, ?)",
+                (planilha, datetime.now().isoformat(timespec="seconds"), len(linhas)),
+            ).lastrowid
+            self.conn.executemany(
+                f"INSERT INTO resultados (execucao, {COLUNAS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(execucao, *linha) for linha in linhas],
+            )
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO situacao_atual ({COLUNAS}, execucao) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(*linha, execucao) for linha in linhas],
+            )
+        return execucao
+
+    def tags_com_ausencias(self, inicio, fim, minimo_semanas=2, status=STATUS_REVERIFICAVEIS):
+        # [(planilha, aba, tag, setor, responsável, semanas, "s1,s2,...")] pela situação atual de cada célula
+        marcadores = ", ".join("?" for _ in status)
+        with self.lock:
+            return self.conn.execute(
+                f"""
+                SELECT planilha, aba, tag, setor, responsavel, COUNT(*), GROUP_CONCAT(semana)
+                FROM situacao_atual
+                WHERE fim >= ? AND inicio <= ? AND status IN ({marcadores})
+                GROUP BY planilha, aba, tag
+                HAVING COUNT(*) >= ?
+                ORDER BY COUNT(*) DESC, planilha, aba, tag
+                """,
+                (inicio.isoformat(), fim.isoformat(), *status, minimo_semanas),
+            ).fetchall()
+
+    def historico_tag(self, tag, inicio=None, fim=None):
+        # Todas as verificações registradas da TAG, da mais antiga para a mais recente
+        with self.lock:
+            return self.conn.execute(
+                f"""
+                SELECT e.executada_em, {", ".join("r." + coluna.strip() for coluna in COLUNAS.split(","))}
+                FROM resultados r JOIN execucoes e ON e.id = r.execucao
+                WHERE r.tag = ? AND r.inicio >= ? AND r.inicio <= ?
+                ORDER BY r.inicio, r.execucao
+                """,
+                (str(tag), (inicio or date.min).isoformat(), (fim or date.max).isoformat()),
+            ).fetchall()
+
+    def execucoes(self, limite=20):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT id, planilha, executada_em, resultados FROM execucoes ORDER BY id DESC LIMIT ?", (limite,)
+            ).fetchall()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def obter_historico():
+    global _historico
+    with _historico_lock:
+        if _historico is None:
+            _historico = HistoricoResultados()
+            logging.info(f"Histórico de resultados aberto em: {_historico.caminho_db}")
+        return _historico
+
+def registrar_resultados(caminho_planilha, resultados):
+    # O histórico é complementar: uma falha aqui não invalida a verificação já gravada na planilha
+    planilha = os.path.basename(caminho_planilha)
+    try:
+        execucao = obter_historico().registrar(planilha, resultados)
+    except sqlite3.Error as e:
+        logging.error(f"Erro ao registrar o histórico de resultados de {planilha}: {e}")
+        return None
+    obter_metricas().contar("resultados_historico", len(resultados))
+    logging.info(f"Histórico: execução {execucao} com {len(resultados)} resultado(s) de {planilha}.")
+    return execucao
+
+def data_argumento(valor):
+    for formato in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"Data inválida: {valor} (use AAAA-MM-DD ou DD/MM/AAAA)")
+
+def imprimir(linhas):
+    for linha in linhas:
+        print("\t".join("" if valor is None else str(valor) for valor in linha))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consultas ao histórico de resultados das verificações.")
+    parser.add_argument("--db", default=HISTORICO_DB_PATH)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    ausentes = comandos.add_parser("ausentes", help="TAGs com semanas NOT FOUND/CORROMPIDO no período (padrão: trimestre atual)")
+    ausentes.add_argument("--minimo", type=int, default=2, help="semanas ausentes para listar a TAG")
+    ausentes.add_argument("--inicio", type=data_argumento)
+    ausentes.add_argument("--fim", type=data_argumento)
+    tag = comandos.add_parser("tag", help="todas as verificações registradas de uma TAG")
+    tag.add_argument("tag")
+    tag.add_argument("--inicio", type=data_argumento)
+    tag.add_argument("--fim", type=data_argumento)
+    execucoes = comandos.add_parser("execucoes", help="últimas execuções registradas")
+    execucoes.add_argument("--limite", type=int, default=20)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"Histórico não encontrado: {args.db}", file=sys.stderr)
+        sys.exit(1)
+    historico = HistoricoResultados(args.db, somente_leitura=True)
+    try:
+        if args.comando == "ausentes":
+            inicio_trimestre, fim_trimestre = trimestre(date.today())
+            imprimir(historico.tags_com_ausencias(args.inicio or inicio_trimestre, args.fim or fim_trimestre, args.minimo))
+        elif args.comando == "tag":
+            imprimir(historico.historico_tag(args.tag, args.inicio, args.fim))
+        else:
+            imprimir(historico.execucoes(args.limite))
+    finally:
+        historico.close()
@@ -0,0 +1,46 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+class RelatorioInicializacao:
+    # Marcos da inicialização da interface, medidos a partir do início do processo
+    def __init__(self, inicio, orcamento):
+        self.inicio = inicio
+        self.orcamento = orcamento
+        self.etapas = []
+        self.lock = threading.Lock()
+
+    def marcar(self, etapa):
+        with self.lock:
+            self.etapas.append((etapa, time.perf_counter() - self.inicio, None))
+
+    @contextmanager
+    def medir(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            fim = time.perf_counter()
+            with self.lock:
+                self.etapas.append((etapa, fim - self.inicio, fim - inicio))
+
+    def tempo(self, etapa):
+        with self.lock:
+            for nome, instante, _ in self.etapas:
+                if nome == etapa:
+                    return instante
+        return None
+
+    def relatar(self, etapa_visivel):
+        with self.lock:
+            campos = {
+                nome: f"{duracao:.3f}s" if duracao is not None else f"@{instante:.3f}s"
+                for nome, instante, duracao in self.etapas
+            }
+        logging.info("Tempo de inicialização", extra={"campos": campos})
+        visivel = self.tempo(etapa_visivel)
+        if visivel is not None and visivel > self.orcamento:
+            logging.warning(
+                f"Janela visível em {visivel:.2f}s, acima do orçamento de inicialização de {self.orcamento:.2f}s."
+            )
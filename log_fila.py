@@ -0,0 +1,65 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+FORMATO = "%(asctime)s - %(levelname)s - %(message)s"
+
+_listener = None
+_lock = threading.Lock()
+
+class FormatadorEstruturado(logging.Formatter):
+    # Campos passados em extra={"campos": {...}} saem como chave=valor no fim da linha
+    def format(self, record):
+        texto = super().format(record)
+        campos = getattr(record, "campos", None)
+        if campos:
+            texto += " | " + " ".join(f"{chave}={valor}" for chave, valor in campos.items())
+        return texto
+
+def configurar_log(caminho, nivel=logging.INFO):
+    # As threads só enfileiram o registro; a escrita no arquivo fica com a thread do QueueListener
+    global _listener
+    with _lock:
+        raiz = logging.getLogger()
+        raiz.setLevel(nivel)
+        if _listener is not None:
+            return _listener
+        arquivo = logging.FileHandler(caminho, encoding="utf-8")
+        arquivo.setFormatter(FormatadorEstruturado(FORMATO))
+        fila = queue.SimpleQueue()
+        for handler in list(raiz.handlers):
+            raiz.removeHandler(handler)
+        raiz.addHandler(QueueHandler(fila))
+        _listener = QueueListener(fila, arquivo, respect_handler_level=True)
+        _listener.start()
+        atexit.register(encerrar_log)
+        return _listener
+
+def encerrar_log():
+    # Esvazia a fila antes de sair para não perder as últimas linhas
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+class LimitadorLog:
+    # Deixa passar no máximo uma mensagem por chave a cada `intervalo` segundos
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.ultimos = {}
+        self.lock = threading.Lock()
+
+    def permitir(self, chave="", forcar=False):
+        agora = time.monotonic()
+        with self.lock:
+            if not forcar and agora - self.ultimos.get(chave, float("-inf")) < self.intervalo:
+                return False
+            self.ultimos[chave] = agora
+            return True
@@ -0,0 +1,144 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from storage_settings import METRICAS_JSON_PATH, METRICAS_PROM_PATH, METRICAS_PASTAS_LENTAS
+from storage_agendador import share_do_caminho
+
+_metricas = None
+_metricas_lock = threading.Lock()
+
+class MetricasExecucao:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inicio = time.time()
+        self.inicio_perf = time.perf_counter()
+        self.fases = defaultdict(lambda: [0.0, 0])  # fase -> [segundos, chamadas]
+        self.contadores = defaultdict(int)
+        self.shares = defaultdict(lambda: [0, 0.0, 0.0])  # share -> [pastas, segundos, máximo]
+        self.latencia_pastas = {}  # caminho -> segundos (última listagem)
+
+    @contextmanager
+    def fase(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracao = time.perf_counter() - inicio
+            with self.lock:
+                self.fases[nome][0] += duracao
+                self.fases[nome][1] += 1
+
+    def contar(self, nome, quantidade=1):
+        with self.lock:
+            self.contadores[nome] += quantidade
+
+    def registrar_pasta(self, caminho, latencia):
+        share = share_do_caminho(caminho)
+        with self.lock:
+            self.contadores["pastas"] += 1
+            dados = self.shares[share]
+            dados[0] += 1
+            dados[1] += latencia
+            dados[2] = max(dados[2], latencia)
+            self.latencia_pastas[caminho] = latencia
+
+    def resumo(self, sucesso):
+        with self.lock:
+            lentas = sorted(self.latencia_pastas.items(), key=lambda item: item[1], reverse=True)
+            return {
+                "inicio": datetime.fromtimestamp(self.inicio).isoformat(timespec="seconds"),
+                "duracao_segundos": round(time.perf_counter() - self.inicio_perf, 6),
+                "sucesso": bool(sucesso),
+                "fases": {
+                    nome: {"segundos": round(segundos, 6), "chamadas": chamadas}
+                    for nome, (segundos, chamadas) in self.fases.items()
+                },
+                "contadores": dict(self.contadores),
+                "shares": {
+                    share: {"pastas": pastas, "segundos": round(segundos, 6), "maximo_segundos": round(maximo, 6)}
+                    for share, (pastas, segundos, maximo) in self.shares.items()
+                },
+                "pastas_mais_lentas": [
+                    {"caminho": caminho, "segundos": round(latencia, 6)}
+                    for caminho, latencia in lentas[:METRICAS_PASTAS_LENTAS]
+                ],
+            }
+
+    def exportar(self, sucesso, caminho_json=None, caminho_prom=None):
+        caminho_json = caminho_json or METRICAS_JSON_PATH
+        caminho_prom = caminho_prom or METRICAS_PROM_PATH
+        resumo = self.resumo(sucesso)
+        try:
+            _gravar_atomico(caminho_json, json.dumps(resumo, ensure_ascii=False, indent=2))
+            _gravar_atomico(caminho_prom, formatar_prometheus(resumo, self.inicio))
+        except OSError as e:
+            logging.error(f"Erro ao gravar métricas da execução: {e}")
+            return resumo
+        logging.info(
+            f"Métricas da execução ({resumo['duracao_segundos']:.2f}s)",
+            extra={"campos": {nome: f"{dados['segundos']:.2f}s" for nome, dados in resumo["fases"].items()}},
+        )
+        return resumo
+
+def _rotulo(valor):
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def formatar_prometheus(resumo, inicio):
+    linhas = [
+        "# HELP bkp_verificacao_sucesso 1 se a última verificação terminou com sucesso.",
+        "# TYPE bkp_verificacao_sucesso gauge",
+        f"bkp_verificacao_sucesso {int(resumo['sucesso'])}",
+        "# HELP bkp_verificacao_inicio_timestamp_segundos Início da última verificação (epoch).",
+        "# TYPE bkp_verificacao_inicio_timestamp_segundos gauge",
+        f"bkp_verificacao_inicio_timestamp_segundos {inicio:.0f}",
+        "# HELP bkp_verificacao_duracao_segundos Duração total da última verificação.",
+        "# TYPE bkp_verificacao_duracao_segundos gauge",
+        f"bkp_verificacao_duracao_segundos {resumo['duracao_segundos']}",
+        "# HELP bkp_verificacao_fase_segundos Tempo acumulado em cada fase da verificação.",
+        "# TYPE bkp_verificacao_fase_segundos gauge",
+    ]
+    linhas += [f'bkp_verificacao_fase_segundos{{fase="{_rotulo(nome)}"}} {dados["segundos"]}' for nome, dados in resumo["fases"].items()]
+    linhas += [
+        "# HELP bkp_verificacao_contador Contadores da última verificação (pastas, arquivos, stats, retentativas...).",
+        "# TYPE bkp_verificacao_contador gauge",
+    ]
+    linhas += [f'bkp_verificacao_contador{{nome="{_rotulo(nome)}"}} {valor}' for nome, valor in resumo["contadores"].items()]
+    linhas += [
+        "# HELP bkp_verificacao_share_pastas Pastas listadas por share.",
+        "# TYPE bkp_verificacao_share_pastas gauge",
+        "# HELP bkp_verificacao_share_latencia_segundos Latência somada das listagens por share.",
+        "# TYPE bkp_verificacao_share_latencia_segundos gauge",
+        "# HELP bkp_verificacao_share_latencia_maxima_segundos Listagem mais lenta por share.",
+        "# TYPE bkp_verificacao_share_latencia_maxima_segundos gauge",
+    ]
+    for share, dados in resumo["shares"].items():
+        rotulo = f'{{share="{_rotulo(share)}"}}'
+        linhas.append(f"bkp_verificacao_share_pastas{rotulo} {dados['pastas']}")
+        linhas.append(f"bkp_verificacao_share_latencia_segundos{rotulo} {dados['segundos']}")
+        linhas.append(f"bkp_verificacao_share_latencia_maxima_segundos{rotulo} {dados['maximo_segundos']}")
+    return "\n".join(linhas) + "\n"
+
+def _gravar_atomico(caminho, conteudo):
+    # O coletor de textfile pode ler a qualquer momento: grava ao lado e troca de uma vez
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        arquivo.write(conteudo)
+    os.replace(temporario, caminho)
+
+def iniciar_metricas():
+    global _metricas
+    with _metricas_lock:
+        _metricas = MetricasExecucao()
+        return _metricas
+
+def obter_metricas():
+    global _metricas
+    with _metricas_lock:
+        if _metricas is None:
+            _metricas = MetricasExecucao()
+        return _metricas
@@ -0,0 +1,272 @@
+import os
+import re
+import struct
+import tempfile
+import zipfile
+import zlib
+import logging
+import posixpath
+from collections import defaultdict
+from xml.sax.saxutils import escape
+import xml.etree.ElementTree as ET
+from openpyxl.utils import get_column_letter, column_index_from_string
+from planilha_estilos import aparencia
+
+NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+RE_ROW = re.compile(r"<row\b[^>]*?(?:/>|>.*?</row>)", re.DOTALL)
+RE_CELL = re.compile(r"<c\b[^>]*?(?:/>|>.*?</c>)", re.DOTALL)
+RE_REF_CELL = re.compile(r'\br="([A-Z]+)(\d+)"')
+RE_REF_ROW = re.compile(r'\br="(\d+)"')
+RE_ESTILO = re.compile(r'\bs="(\d+)"')
+
+class ErroDelta(Exception):
+    pass
+
+def _caminho_parte(base, alvo):
+    if alvo.startswith("/"):
+        return alvo.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), alvo))
+
+def _partes_das_abas(zin):
+    rels = ET.fromstring(zin.read("xl/_rels/workbook.xml.rels"))
+    alvos = {rel.get("Id"): rel.get("Target") for rel in rels}
+    workbook = ET.fromstring(zin.read("xl/workbook.xml"))
+    partes = {}
+    for sheet in workbook.iter(f"{NS_MAIN}sheet"):
+        alvo = alvos.get(sheet.get(f"{NS_REL}id"))
+        if alvo:
+            partes[sheet.get("name")] = _caminho_parte("xl/workbook.xml", alvo)
+    return partes
+
+class EstilosDelta:
+    # Acrescenta ao styles.xml apenas os fills/fonts/xfs que ainda não existem
+    def __init__(self, xml):
+        self.xml = xml
+        self.fonts = self._itens("fonts", "font")
+        self.fills = self._itens("fills", "fill")
+        self.xfs = self._itens("cellXfs", "xf")
+        self.derivados = {}
+        self.alterado = False
+        fonte_padrao = self.fonts[0] if self.fonts else ""
+        self.base_fonte = "".join(re.findall(r"<(?:sz|name)\b[^>]*/>", fonte_padrao))
+
+    def _secao(self, secao):
+        match = re.search(rf"<{secao}\b[^>]*?(?:/>|>(.*?)</{secao}>)", self.xml, re.DOTALL)
+        if not match:
+            raise ErroDelta(f"Seção {secao} não encontrada em styles.xml")
+        return match
+
+    def _itens(self, secao, item):
+        conteudo = self._secao(secao).group(1) or ""
+        return re.findall(rf"<{item}\b[^>]*?(?:/>|>.*?</{item}>)", conteudo, re.DOTALL)
+
+    def _indice(self, lista, item_xml):
+        if item_xml in lista:
+            return lista.index(item_xml)
+        lista.append(item_xml)
+        self.alterado = True
+        return len(lista) - 1
+
+    def estilo(self, s_original, status):
+        chave = (s_original, status)
+        if chave in self.derivados:
+            return self.derivados[chave]
+        if s_original >= len(self.xfs):
+            raise ErroDelta(f"Estilo {s_original} inexistente em cellXfs")
+        # Mesmas cores dos estilos nomeados; borda e formato numérico vêm do xf original da célula
+        _, cor_fill, cor_fonte, negrito = aparencia(status)
+        cor_fill, cor_fonte = f"FF{cor_fill}", f"FF{cor_fonte}"
+        negrito_xml = '<b val="1"/>' if negrito else ""
+        fonte = f'<font>{negrito_xml}{self.base_fonte}<color rgb="{cor_fonte}"/></font>'
+        fill = (
+            f'<fill><patternFill patternType="solid"><fgColor rgb="{cor_fill}"/>'
+            f'<bgColor rgb="{cor_fill}"/></patternFill></fill>'
+        )
+        font_id = self._indice(self.fonts, fonte)
+        fill_id = self._indice(self.fills, fill)
+        xf = self.xfs[s_original]
+        abertura = re.match(r"<xf\b[^>]*?(?=/?>)", xf).group(0)
+        for atributo, valor in (("fontId", font_id), ("fillId", fill_id), ("applyFont", 1), ("applyFill", 1), ("applyAlignment", 1)):
+            if re.search(rf'\b{atributo}="[^"]*"', abertura):
+                abertura = re.sub(rf'\b{atributo}="[^"]*"', f'{atributo}="{valor}"', abertura)
+            else:
+                abertura += f' {atributo}="{valor}"'
+        filhos = "" if re.match(r"<xf\b[^>]*?/>", xf) else xf[xf.index(">") + 1 : -len("</xf>")]
+        filhos = re.sub(r"<alignment\b[^>]*?(?:/>|>.*?</alignment>)", "", filhos, flags=re.DOTALL)
+        novo_xf = f'{abertura}><alignment horizontal="center" vertical="center"/>{filhos}</xf>'
+        indice = self._indice(self.xfs, novo_xf)
+        self.derivados[chave] = indice
+        return indice
+
+    def serializar(self):
+        xml = self.xml
+        for secao, lista in (("fonts", self.fonts), ("fills", self.fills), ("cellXfs", self.xfs)):
+            match = re.search(rf"<{secao}\b[^>]*?(?:/>|>(.*?)</{secao}>)", xml, re.DOTALL)
+            abertura = re.match(rf"<{secao}\b[^>]*?(?=/?>)", match.group(0)).group(0)
+            abertura = re.sub(r'\s+count="\d+"', "", abertura)
+            xml = xml[: match.start()] + f'{abertura} count="{len(lista)}">{"".join(lista)}</{secao}>' + xml[match.end():]
+        return xml
+
+def _celula_xml(ref, estilo, valor):
+    return f'<c r="{ref}" s="{estilo}" t="inlineStr"><is><t>{escape(str(valor))}</t></is></c>'
+
+def _aplicar_na_linha(row_xml, numero, alteracoes_linha, estilos):
+    if row_xml is None:
+        abertura, conteudo = f'<row r="{numero}"', ""
+    else:
+        abertura = re.match(r"<row\b[^>]*?(?=/?>)", row_xml).group(0)
+        abertura = re.sub(r'\s+spans="[^"]*"', "", abertura)
+        conteudo = "" if row_xml.endswith("/>") else row_xml[row_xml.index(">") + 1 : -len("</row>")]
+    celulas = []
+    for match in RE_CELL.finditer(conteudo):
+        ref = RE_REF_CELL.search(match.group(0)[: match.group(0).find(">") + 1])
+        if not ref:
+            raise ErroDelta(f"Célula sem referência na linha {numero}")
+        celulas.append([column_index_from_string(ref.group(1)), match.group(0)])
+    if RE_CELL.sub("", conteudo).strip():
+        raise ErroDelta(f"Conteúdo inesperado na linha {numero}")
+    por_coluna = {coluna: i for i, (coluna, _) in enumerate(celulas)}
+    for alteracao in alteracoes_linha:
+        ref = f"{get_column_letter(alteracao.coluna)}{numero}"
+        if alteracao.coluna in por_coluna:
+            atual = celulas[por_coluna[alteracao.coluna]][1]
+            if "<f>" in atual or "<f " in atual:
+                raise ErroDelta(f"Célula {ref} contém fórmula")
+            estilo = RE_ESTILO.search(atual[: atual.find(">") + 1])
+            s_original = int(estilo.group(1)) if estilo else 0
+            celulas[por_coluna[alteracao.coluna]][1] = _celula_xml(ref, estilos.estilo(s_original, alteracao.status), alteracao.valor)
+        else:
+            por_coluna[alteracao.coluna] = len(celulas)
+            celulas.append([alteracao.coluna, _celula_xml(ref, estilos.estilo(0, alteracao.status), alteracao.valor)])
+    celulas.sort(key=lambda celula: celula[0])
+    return f'{abertura}>{"".join(xml for _, xml in celulas)}</row>'
+
+def aplicar_na_aba(xml, alteracoes, estilos):
+    match = re.search(r"<sheetData\b[^>]*?(?:/>|>(.*?)</sheetData>)", xml, re.DOTALL)
+    if not match:
+        raise ErroDelta("sheetData não encontrado")
+    conteudo = match.group(1) or ""
+    por_linha = defaultdict(list)
+    for alteracao in alteracoes:
+        por_linha[alteracao.linha].append(alteracao)
+    partes = []
+    ultimo = 0
+    pendentes = sorted(por_linha)
+    for row in RE_ROW.finditer(conteudo):
+        ref = RE_REF_ROW.search(row.group(0)[: row.group(0).find(">") + 1])
+        if not ref:
+            raise ErroDelta("Linha sem referência na aba")
+        numero = int(ref.group(1))
+        partes.append(conteudo[ultimo : row.start()])
+        while pendentes and pendentes[0] < numero:
+            linha = pendentes.pop(0)
+            partes.append(_aplicar_na_linha(None, linha, por_linha[linha], estilos))
+        if pendentes and pendentes[0] == numero:
+            pendentes.pop(0)
+            partes.append(_aplicar_na_linha(row.group(0), numero, por_linha[numero], estilos))
+        else:
+            partes.append(row.group(0))
+        ultimo = row.end()
+    partes.append(conteudo[ultimo:])
+    for linha in pendentes:
+        partes.append(_aplicar_na_linha(None, linha, por_linha[linha], estilos))
+    abertura = re.match(r"<sheetData\b[^>]*?(?=/?>)", match.group(0)).group(0)
+    return xml[: match.start()] + f'{abertura}>{"".join(partes)}</sheetData>' + xml[match.end():]
+
+def _dos_datetime(date_time):
+    ano, mes, dia, hora, minuto, segundo = date_time
+    return (hora << 11) | (minuto << 5) | (segundo // 2), ((max(ano, 1980) - 1980) << 9) | (mes << 5) | dia
+
+def _gravar_zip(caminho_origem, destino, zin, novos):
+    entradas_centrais = []
+    with open(caminho_origem, "rb") as origem:
+        for info in zin.infolist():
+            if info.flag_bits & 0x1:
+                raise ErroDelta("Pacote criptografado")
+            nome = info.filename
+            try:
+                nome_bytes = nome.encode("ascii")
+                flags = info.flag_bits & ~0x808
+            except UnicodeEncodeError:
+                nome_bytes = nome.encode("utf-8")
+                flags = (info.flag_bits & ~0x8) | 0x800
+            if nome in novos:
+                dados = novos[nome]
+                compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+                bruto = compressor.compress(dados) + compressor.flush()
+                metodo, crc, tamanho = zipfile.ZIP_DEFLATED, zlib.crc32(dados), len(dados)
+                flags &= ~0x6
+            else:
+                # Partes inalteradas: bytes comprimidos copiados como estão
+                origem.seek(info.header_offset)
+                cabecalho = origem.read(30)
+                if cabecalho[:4] != b"PK\x03\x04":
+                    raise ErroDelta(f"Cabeçalho local inválido em {nome}")
+                tam_nome, tam_extra = struct.unpack("<2H", cabecalho[26:30])
+                origem.seek(info.header_offset + 30 + tam_nome + tam_extra)
+                bruto = origem.read(info.compress_size)
+                metodo, crc, tamanho = info.compress_type, info.CRC, info.file_size
+            offset = destino.tell()
+            if offset > 0xFFFFFFFF or len(bruto) > 0xFFFFFFFF or tamanho > 0xFFFFFFFF:
+                raise ErroDelta("Pacote exige ZIP64")
+            hora, data = _dos_datetime(info.date_time)
+            destino.write(
+                struct.pack("<4s5H3L2H", b"PK\x03\x04", 20, flags, metodo, hora, data, crc, len(bruto), tamanho, len(nome_bytes), 0)
+            )
+            destino.write(nome_bytes)
+            destino.write(bruto)
+            entradas_centrais.append(
+                struct.pack(
+                    "<4s6H3L5H2L", b"PK\x01\x02", 20, 20, flags, metodo, hora, data, crc, len(bruto), tamanho,
+                    len(nome_bytes), 0, 0, 0, info.internal_attr, info.external_attr, offset,
+                ) + nome_bytes
+            )
+    inicio_central = destino.tell()
+    for entrada in entradas_centrais:
+        destino.write(entrada)
+    tamanho_central = destino.tell() - inicio_central
+    total = len(entradas_centrais)
+    destino.write(struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, total, total, tamanho_central, inicio_central, 0))
+
+def gravar_alteracoes_delta(caminho_excel, alteracoes):
+    por_aba = defaultdict(list)
+    for alteracao in alteracoes:
+        por_aba[alteracao.aba].append(alteracao)
+    try:
+        zin = zipfile.ZipFile(caminho_excel)
+    except zipfile.BadZipFile as e:
+        raise ErroDelta(f"Arquivo não é um pacote xlsx: {e}")
+    with zin:
+        try:
+            partes = _partes_das_abas(zin)
+            estilos = EstilosDelta(zin.read("xl/styles.xml").decode("utf-8"))
+        except (KeyError, ET.ParseError) as e:
+            raise ErroDelta(f"Estrutura do pacote não suportada: {e}")
+        novos = {}
+        for aba, alteracoes_aba in por_aba.items():
+            if aba not in partes:
+                raise ErroDelta(f"Aba {aba} não encontrada no pacote")
+            xml = zin.read(partes[aba]).decode("utf-8")
+            novos[partes[aba]] = aplicar_na_aba(xml, alteracoes_aba, estilos).encode("utf-8")
+        if estilos.alterado:
+            novos["xl/styles.xml"] = estilos.serializar().encode("utf-8")
+        pasta = os.path.dirname(os.path.abspath(caminho_excel))
+        descritor, temporario = tempfile.mkstemp(dir=pasta, suffix=".tmp")
+        try:
+            with os.fdopen(descritor, "wb") as destino:
+                _gravar_zip(caminho_excel, destino, zin, novos)
+                destino.flush()
+                os.fsync(destino.fileno())
+        except BaseException:
+            os.remove(temporario)
+            raise
+    try:
+        os.replace(temporario, caminho_excel)
+    except BaseException:
+        os.remove(temporario)
+        raise
+    logging.info(
+        f"{len(alteracoes)} células gravadas por delta em {len(novos)} partes de {os.path.basename(caminho_excel)}."
+    )
@@ -0,0 +1,36 @@
+import logging
+from collections import defaultdict
+import openpyxl
+from planilha_estilos import registrar_estilos, aplicar_estilo, apply_results
+from planilha_layout import AlteracaoCelula, STATUS_OK, STATUS_NAO_ENCONTRADO, STATUS_CORROMPIDO, STATUS_REVERIFICAVEIS
+from planilha_delta import gravar_alteracoes_delta, ErroDelta
+
+def caminho_verde(dados_adicionados, arquivo_nome, arquivo_caminho, celula):
+    registrar_estilos(celula.parent.parent)
+    celula.value = dados_adicionados
+    aplicar_estilo(celula, STATUS_OK)
+
+def caminho_vermelho(celula):
+    registrar_estilos(celula.parent.parent)
+    celula.value = STATUS_NAO_ENCONTRADO
+    aplicar_estilo(celula, STATUS_NAO_ENCONTRADO)
+
+def gravar_alteracoes_openpyxl(caminho_excel, alteracoes):
+    por_aba = defaultdict(list)
+    for alteracao in alteracoes:
+        por_aba[alteracao.aba].append(alteracao)
+    wb = openpyxl.load_workbook(caminho_excel)
+    try:
+        for aba, alteracoes_aba in por_aba.items():
+            apply_results(wb[aba], ((a.linha, a.coluna, a.valor, a.status) for a in alteracoes_aba))
+        wb.save(caminho_excel)
+        logging.info(f"{len(alteracoes)} células gravadas em {len(por_aba)} abas.")
+    finally:
+        wb.close()
+
+def gravar_alteracoes(caminho_excel, alteracoes):
+    try:
+        gravar_alteracoes_delta(caminho_excel, alteracoes)
+    except ErroDelta as e:
+        logging.warning(f"Gravação por delta indisponível ({e}); salvando a planilha inteira.")
+        gravar_alteracoes_openpyxl(caminho_excel, alteracoes)
@@ -0,0 +1,52 @@
+from copy import copy
+from openpyxl.styles import NamedStyle, PatternFill, Font, Alignment
+from planilha_layout import STATUS_OK, STATUS_NAO_ENCONTRADO, STATUS_CORROMPIDO
+
+ESTILO_OK = "BKP OK"
+ESTILO_NAO_ENCONTRADO = "BKP NOT FOUND"
+ESTILO_CORROMPIDO = "BKP CORROMPIDO"
+
+def _novo_estilo(nome, cor_fill, cor_fonte, negrito):
+    estilo = NamedStyle(name=nome)
+    estilo.fill = PatternFill(start_color=cor_fill, end_color=cor_fill, fill_type="solid")
+    estilo.font = Font(color=cor_fonte, bold=negrito)
+    estilo.alignment = Alignment(horizontal="center", vertical="center")
+    return estilo
+
+# Aparências definidas uma vez: o gravador openpyxl registra os estilos nomeados na pasta de trabalho
+# e o gravador por delta (planilha_delta) deriva do mesmo registro os fills/fonts que acrescenta ao styles.xml
+ESTILOS = {
+    STATUS_OK: (ESTILO_OK, "00FF00", "000000", False),
+    STATUS_NAO_ENCONTRADO: (ESTILO_NAO_ENCONTRADO, "FF0000", "FFFFFF", True),
+    STATUS_CORROMPIDO: (ESTILO_CORROMPIDO, "FF8C00", "000000", True),
+}
+
+def registrar_estilos(wb):
+    for nome, cor_fill, cor_fonte, negrito in ESTILOS.values():
+        if nome not in wb.named_styles:
+            wb.add_named_style(_novo_estilo(nome, cor_fill, cor_fonte, negrito))
+
+def aparencia(status):
+    # (nome, cor do fill, cor da fonte, negrito); status desconhecido cai em NOT FOUND
+    return ESTILOS.get(status, ESTILOS[STATUS_NAO_ENCONTRADO])
+
+def nome_estilo(status):
+    return aparencia(status)[0]
+
+def aplicar_estilo(celula, status):
+    # O estilo nomeado substitui o formato inteiro; bordas e formato numérico da planilha são mantidos
+    borda, formato = copy(celula.border), celula.number_format
+    celula.style = nome_estilo(status)
+    celula.border = borda
+    celula.number_format = formato
+
+def apply_results(ws, cells):
+    # cells: iterável de (linha, coluna, valor, status), ex.: AlteracaoCelula sem a aba
+    registrar_estilos(ws.parent)
+    total = 0
+    for linha, coluna, valor, status in cells:
+        celula = ws.cell(row=linha, column=coluna)
+        celula.value = valor
+        aplicar_estilo(celula, status)
+        total += 1
+    return total
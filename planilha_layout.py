@@ -0,0 +1,211 @@
+import re
+import logging
+import unicodedata
+from datetime import date, datetime, timedelta
+from collections import namedtuple
+
+PRIMEIRA_COLUNA_SEMANA = 6
+PRIMEIRA_LINHA_DADOS = 4
+LINHA_MESES = 1
+LINHA_SEMANAS = 2
+LINHA_INTERVALOS = 3
+
+MESES = {
+    "JANEIRO": 1, "FEVEREIRO": 2, "MARCO": 3, "ABRIL": 4, "MAIO": 5, "JUNHO": 6,
+    "JULHO": 7, "AGOSTO": 8, "SETEMBRO": 9, "OUTUBRO": 10, "NOVEMBRO": 11, "DEZEMBRO": 12,
+}
+
+REGEX_SEMANA = re.compile(r"(?:Semana\s*|\s*)(\d+)(?:\s*ª|\s*)", re.IGNORECASE)
+
+STATUS_OK = "OK"
+STATUS_NAO_ENCONTRADO = "NOT FOUND"
+STATUS_CORROMPIDO = "CORROMPIDO"
+# Células com estes valores são verificadas de novo a cada execução
+STATUS_REVERIFICAVEIS = (STATUS_NAO_ENCONTRADO, STATUS_CORROMPIDO)
+
+LinhaPlanilha = namedtuple("LinhaPlanilha", ["linha", "tag", "responsavel", "setor"])
+
+# Alteração de uma célula de resultado decidida na análise, aplicada só na gravação
+AlteracaoCelula = namedtuple("AlteracaoCelula", ["aba", "linha", "coluna", "valor", "status"])
+
+# Resultado de uma (TAG, semana) emitido pela verificação e consumido pelos relatórios
+ResultadoVerificacao = namedtuple(
+    "ResultadoVerificacao", ["aba", "tag", "responsavel", "setor", "semana", "intervalo", "status", "arquivo"]
+)
+
+def parse_interval(interval_str, current_year, current_month):
+    try:
+        if not interval_str:
+            return None, None
+        clean_str = re.sub(r"DIA\s*", "", str(interval_str).upper()).strip()
+        parts = re.split(r"\s*-\s*", clean_str)
+        if len(parts) != 2:
+            return None, None
+        start_day = int(parts[0])
+        end_day = int(parts[1])
+        if start_day > end_day:
+            prev_month = current_month - 1
+            prev_year = current_year
+            if prev_month == 0:
+                prev_month = 12
+                prev_year -= 1
+            start_date = datetime(prev_year, prev_month, start_day)
+            end_date = datetime(current_year, current_month, end_day)
+        else:
+            start_date = datetime(current_year, current_month, start_day)
+            end_date = datetime(current_year, current_month, end_day)
+        return start_date.date(), end_date.date()
+    except (ValueError, TypeError) as e:
+        logging.error(f"Erro ao parsear intervalo '{interval_str}': {e}")
+        return None, None
+
+def mes_do_cabecalho(valor):
+    if valor is None:
+        return None
+    texto = unicodedata.normalize("NFKD", str(valor)).encode("ascii", "ignore").decode().strip().upper()
+    return MESES.get(texto)
+
+def _data(referencia, dia):
+    try:
+        return referencia.replace(day=dia)
+    except ValueError:
+        return None
+
+def intervalo_real(interval_str, ano, mes, semana):
+    # "DIA a - b" sob o cabeçalho do mês: quando a > b a semana começa no mês anterior ou termina no
+    # seguinte; vale o candidato da semana ISO `semana` (ou o que tem a quinta-feira no mês)
+    clean_str = re.sub(r"DIA\s*", "", str(interval_str or "").upper()).strip()
+    parts = re.split(r"\s*-\s*", clean_str)
+    try:
+        start_day, end_day = int(parts[0]), int(parts[1])
+    except (ValueError, IndexError):
+        logging.error(f"Erro ao parsear intervalo '{interval_str}' de {mes:02d}/{ano}")
+        return None
+    inicio_mes = date(ano, mes, 1)
+    if start_day <= end_day:
+        candidatos = [(_data(inicio_mes, start_day), _data(inicio_mes, end_day))]
+    else:
+        mes_anterior = inicio_mes - timedelta(days=1)
+        proximo_mes = (inicio_mes + timedelta(days=31)).replace(day=1)
+        candidatos = [
+            (_data(mes_anterior, start_day), _data(inicio_mes, end_day)),
+            (_data(inicio_mes, start_day), _data(proximo_mes, end_day)),
+        ]
+    candidatos = [(inicio, fim) for inicio, fim in candidatos if inicio and fim]
+    if not candidatos:
+        logging.error(f"Erro ao parsear intervalo '{interval_str}' de {mes:02d}/{ano}")
+        return None
+    for inicio, fim in candidatos:
+        if inicio.isocalendar()[1] == semana:
+            return inicio, fim
+    for inicio, fim in candidatos:
+        if (inicio + timedelta(days=3)).month == mes:
+            return inicio, fim
+    return candidatos[0]
+
+class LayoutPlanilha:
+    # Estrutura da aba lida uma única vez: colunas/intervalos das semanas e índice de linhas
+    def __init__(self, nome, colunas_semana, intervalo_por_semana, linhas, cabecalho_por_semana=None):
+        self.nome = nome
+        self.colunas_semana = colunas_semana  # [(coluna, semana)] na ordem da planilha
+        self.coluna_por_semana = {}
+        for coluna, semana in colunas_semana:
+            self.coluna_por_semana.setdefault(semana, coluna)
+        self.semana_por_coluna = dict(colunas_semana)
+        self.intervalo_por_semana = intervalo_por_semana
+        self.linhas = linhas
+        self.cabecalho_por_semana = cabecalho_por_semana or {}  # semana -> (mês da linha 1, "DIA a - b")
+
+    @classmethod
+    def from_worksheet(cls, ws, ano, mes, nome=None):
+        return TabelaPlanilha.from_worksheet(ws, ano, mes, nome=nome).layout
+
+    def intervalos(self, semanas):
+        return {semana: self.intervalo_por_semana[semana] for semana in semanas if semana in self.intervalo_por_semana}
+
+    def intervalos_reais(self, ano):
+        # Datas de todas as semanas pelo mês do cabeçalho, sem depender do mês corrente
+        intervalos = {}
+        for semana, (mes, interval_str) in self.cabecalho_por_semana.items():
+            if mes is None:
+                continue
+            intervalo = intervalo_real(interval_str, ano, mes, semana)
+            if intervalo:
+                intervalos[semana] = intervalo
+        return intervalos
+
+class TabelaPlanilha:
+    # Valores das colunas de semana guardados por coluna, na ordem de layout.linhas
+    def __init__(self, layout, valores, nao_encontrados=()):
+        self.layout = layout
+        self.nome = layout.nome
+        self.valores = valores  # {coluna: [valor da linha]}
+        self.posicao = {linha.linha: i for i, linha in enumerate(layout.linhas)}
+        self.nao_encontrados = list(nao_encontrados)  # [(linha, coluna)] já marcadas NOT FOUND/CORROMPIDO na leitura
+
+    def valor(self, linha, coluna):
+        return self.valores[coluna][self.posicao[linha]]
+
+    def definir(self, linha, coluna, valor):
+        self.valores[coluna][self.posicao[linha]] = valor
+
+    @classmethod
+    def from_worksheet(cls, ws, ano, mes, nome=None):
+        return cls.from_rows(nome or ws.title, ws.iter_rows(values_only=True), ano, mes)
+
+    @classmethod
+    def from_rows(cls, nome, rows, ano, mes):
+        cabecalho_meses = ()
+        cabecalho_semanas = ()
+        cabecalho_intervalos = ()
+        cabecalho_por_semana = {}
+        colunas_semana = []
+        intervalo_por_semana = {}
+        linhas = []
+        valores = {}
+        nao_encontrados = []
+        for row_idx, row in enumerate(rows, start=1):
+            if row_idx == LINHA_MESES:
+                cabecalho_meses = row
+            elif row_idx == LINHA_SEMANAS:
+                cabecalho_semanas = row
+            elif row_idx == LINHA_INTERVALOS:
+                cabecalho_intervalos = row
+            if row_idx == PRIMEIRA_LINHA_DADOS - 1:
+                mes_corrente = None
+                for col in range(PRIMEIRA_COLUNA_SEMANA, len(cabecalho_semanas) + 1):
+                    # O nome do mês só aparece na primeira coluna de cada mês
+                    if col <= len(cabecalho_meses):
+                        mes_corrente = mes_do_cabecalho(cabecalho_meses[col - 1]) or mes_corrente
+                    header_value = cabecalho_semanas[col - 1]
+                    if header_value is None:
+                        continue
+                    match = REGEX_SEMANA.search(str(header_value))
+                    if not match:
+                        continue
+                    semana = int(match.group(1))
+                    colunas_semana.append((col, semana))
+                    valores[col] = []
+                    if semana not in intervalo_por_semana:
+                        interval_str = cabecalho_intervalos[col - 1] if col <= len(cabecalho_intervalos) else None
+                        cabecalho_por_semana.setdefault(semana, (mes_corrente, interval_str))
+                        start_date, end_date = parse_interval(interval_str, ano, mes)
+                        if start_date and end_date:
+                            intervalo_por_semana[semana] = (start_date, end_date)
+            if row_idx < PRIMEIRA_LINHA_DADOS:
+                continue
+            tag = row[0] if len(row) > 0 else None
+            setor = row[2] if len(row) > 2 else None
+            if not tag or not setor:
+                continue
+            linhas.append(LinhaPlanilha(row_idx, tag, row[1], setor))
+            for col in valores:
+                valor = row[col - 1] if col <= len(row) else None
+                valores[col].append(valor)
+                if valor in STATUS_REVERIFICAVEIS:
+                    nao_encontrados.append((row_idx, col))
+        return cls(
+            LayoutPlanilha(nome, colunas_semana, intervalo_por_semana, linhas, cabecalho_por_semana),
+            valores,
+            nao_encontrados,
+        )
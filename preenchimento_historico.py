@@ -0,0 +1,121 @@
+import argparse
+import logging
+import os
+import sys
+from datetime import date
+import openpyxl
+from storage_settings import EXCEL_PATH, HISTORICO_RESULTADOS, ANALISE_TAMANHOS
+from metricas import iniciar_metricas
+from planilha_layout import TabelaPlanilha
+from planilha_escrita import gravar_alteracoes
+from historico_resultados import registrar_resultados, data_argumento
+from analise_tamanhos import analisar_abas
+import storage_verificar
+from storage_verificar import (
+    PipelineVerificacao,
+    enviar_email_notificacao,
+    planejar_aba,
+    retry,
+    verificar_aba,
+)
+
+def semanas_no_periodo(layout, ano, inicio, fim):
+    # Semanas da planilha cujo intervalo real toca [inicio, fim]
+    return {
+        semana: intervalo
+        for semana, intervalo in layout.intervalos_reais(ano).items()
+        if intervalo[0] <= fim and intervalo[1] >= inicio
+    }
+
+def preencher_historico(excel_path, inicio, fim, ano=None, send_email=False, stop_event=None):
+    metricas = iniciar_metricas()
+    sucesso = False
+    try:
+        sucesso = _preencher_historico(excel_path, inicio, fim, ano, send_email, stop_event, metricas)
+        return sucesso
+    finally:
+        metricas.exportar(sucesso)
+
+def _preencher_historico(excel_path, inicio, fim, ano, send_email, stop_event, metricas):
+    # Semanas futuras ainda não podem ser marcadas como NOT FOUND
+    fim = min(fim, date.today())
+    ano = ano or inicio.year
+    if inicio > fim:
+        logging.error(f"Período inválido para o preenchimento: {inicio} a {fim}.")
+        return False
+    if not os.path.exists(excel_path):
+        logging.error(f"Erro: O arquivo {excel_path} não foi encontrado.")
+        return False
+    if not retry(os.path.exists, storage_verificar.STORAGE_BASE, stop_event=stop_event):
+        logging.error(f"Erro: Storage remoto {storage_verificar.STORAGE_BASE} não acessível.")
+        return False
+    logging.info(f"Preenchimento histórico de {inicio:%d/%m/%Y} a {fim:%d/%m/%Y} na planilha {excel_path} (ano {ano}).")
+
+    # Um pipeline para todas as abas e meses: cada TAG é varrida uma vez com todas as suas pastas MM-YYYY
+    pipeline = PipelineVerificacao(stop_event=stop_event)
+    abas = []
+    with metricas.fase("carga_planilha"):
+        wb = retry(openpyxl.load_workbook, excel_path, read_only=True, stop_event=stop_event)
+    try:
+        for sheet_name in wb.sheetnames:
+            if stop_event and stop_event.is_set():
+                pipeline.cancelar()
+                return False
+            with metricas.fase("leitura_cabecalhos"):
+                tabela = TabelaPlanilha.from_worksheet(wb[sheet_name], ano, fim.month, nome=sheet_name)
+            intervalos = semanas_no_periodo(tabela.layout, ano, inicio, fim)
+            if not intervalos:
+                logging.warning(f"Aba {sheet_name}: nenhuma semana no período.")
+                continue
+            with metricas.fase("planejamento"):
+                aba = planejar_aba(tabela, sorted(intervalos), pipeline, stop_event, intervalos_por_semana=intervalos)
+            if aba is None:
+                pipeline.cancelar()
+                return False
+            abas.append(aba)
+    finally:
+        wb.close()
+
+    alteracoes = []
+    resultados = []
+    for aba in abas:
+        # ano=None: sem o corte pelo ano corrente, a semana 1 pode começar em dezembro do ano anterior
+        with metricas.fase("correspondencia"):
+            ok = verificar_aba(
+                aba, pipeline, sorted(aba.intervalos_por_semana), None, alteracoes, resultados, stop_event, ano_planilha=ano
+            )
+        if not ok:
+            pipeline.cancelar()
+            return False
+    # verificar_aba também devolve os NOT FOUND/CORROMPIDO já gravados em qualquer semana da aba;
+    # histórico e e-mail ficam só com o período pedido
+    resultados = [
+        resultado for resultado in resultados
+        if resultado.intervalo[0] <= fim and resultado.intervalo[1] >= inicio
+    ]
+    if alteracoes:
+        with metricas.fase("gravacao"):
+            retry(gravar_alteracoes, excel_path, alteracoes, stop_event=stop_event)
+    metricas.contar("celulas_alteradas", len(alteracoes))
+    logging.info(f"Preenchimento histórico concluído: {len(alteracoes)} célula(s) em {len(abas)} aba(s).")
+    if HISTORICO_RESULTADOS:
+        with metricas.fase("historico"):
+            registrar_resultados(excel_path, resultados)
+    if send_email:
+        anomalias = []
+        if ANALISE_TAMANHOS:
+            with metricas.fase("analise_tamanhos"):
+                anomalias = analisar_abas(abas)
+        with metricas.fase("email"):
+            enviar_email_notificacao(resultados, stop_event=stop_event, anomalias=anomalias)
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Preenche semanas de um período inteiro com uma única varredura.")
+    parser.add_argument("inicio", type=data_argumento)
+    parser.add_argument("fim", type=data_argumento)
+    parser.add_argument("--planilha", default=EXCEL_PATH)
+    parser.add_argument("--ano", type=int, help="ano da planilha (padrão: ano da data inicial)")
+    parser.add_argument("--email", action="store_true", help="envia o relatório dos ausentes no período")
+    args = parser.parse_args()
+    sys.exit(0 if preencher_historico(args.planilha, args.inicio, args.fim, args.ano, args.email) else 1)
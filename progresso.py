@@ -0,0 +1,86 @@
+import queue
+import time
+from collections import namedtuple
+
+# Estado consolidado do lado da interface a partir dos eventos drenados
+EstadoProgresso = namedtuple(
+    "EstadoProgresso", ["fracao", "pastas", "arquivos", "abas", "total_abas", "tarefas", "total_tarefas", "eta"]
+)
+
+class CanalProgresso:
+    # O worker só enfileira tuplas (tipo, valor); quem desenha é a thread do Tk ao drenar
+    def __init__(self):
+        self.fila = queue.SimpleQueue()
+        self.inicio = None
+        self.fracao = 0.0
+        self.pastas = 0
+        self.arquivos = 0
+        self.abas = 0
+        self.total_abas = 0
+        self.tarefas = 0
+        self.total_tarefas = 0
+        self.concluido = False
+
+    # Lado do worker
+    def iniciar(self, total_abas):
+        self.fila.put(("inicio", (time.monotonic(), total_abas)))
+
+    def tarefas_planejadas(self, quantidade):
+        if quantidade:
+            self.fila.put(("tarefas", quantidade))
+
+    def tarefa_concluida(self, pastas, arquivos):
+        self.fila.put(("varredura", (pastas, arquivos)))
+
+    def aba_concluida(self):
+        self.fila.put(("aba", 1))
+
+    def concluir(self):
+        self.fila.put(("fim", None))
+
+    # Lado da interface
+    def drenar(self):
+        houve_eventos = False
+        while True:
+            try:
+                tipo, valor = self.fila.get_nowait()
+            except queue.Empty:
+                break
+            houve_eventos = True
+            if tipo == "inicio":
+                self.inicio, self.total_abas = valor
+            elif tipo == "tarefas":
+                self.total_tarefas += valor
+            elif tipo == "varredura":
+                self.tarefas += 1
+                self.pastas += valor[0]
+                self.arquivos += valor[1]
+            elif tipo == "aba":
+                self.abas += 1
+            elif tipo == "fim":
+                self.concluido = True
+        if not houve_eventos:
+            return None
+        return self.estado()
+
+    def estado(self):
+        if self.concluido:
+            fracao = 1.0
+        else:
+            # Varreduras e abas casadas pesam igual; a fração nunca volta para trás
+            total = self.total_tarefas + self.total_abas
+            fracao = (self.tarefas + self.abas) / total if total else 0.0
+        self.fracao = max(self.fracao, min(fracao, 1.0))
+        eta = None
+        if self.inicio is not None and 0 < self.fracao < 1:
+            decorrido = time.monotonic() - self.inicio
+            eta = decorrido * (1 - self.fracao) / self.fracao
+        return EstadoProgresso(
+            self.fracao, self.pastas, self.arquivos, self.abas, self.total_abas, self.tarefas, self.total_tarefas, eta
+        )
+
+def formatar_eta(segundos):
+    if segundos is None:
+        return ""
+    minutos, segundos = divmod(int(segundos), 60)
+    return f"{minutos}m{segundos:02d}s" if minutos else f"{segundos}s"
@@ -0,0 +1,119 @@
+import io
+from html import escape
+from string import Template
+from collections import defaultdict
+from planilha_layout import STATUS_OK, STATUS_CORROMPIDO
+
+RESPONSAVEL_PADRAO = "Não especificado"
+
+CABECALHO = """
+<html>
+  <body>
+    <h2 style="color: red;">Backups Ausentes Detectados</h2>
+"""
+
+BLOCO_TAG = Template("""
+        <div style="margin-bottom: 15px; padding: 10px; border: 1px solid #ccc; border-radius: 5px;">
+            <p>TAG: <strong>$tag</strong></p>
+            <p>Responsável: <strong><span style="color: red;">$responsavel</span></strong></p>
+            <p>Setor: <strong>$setor</strong></p>
+            <p>Semanas: $semanas</p>
+            <p>Quantidade de backups faltantes: <strong><span style="color: red;">$quantidade</span></strong></p>
+            <p>Intervalos: $intervalos</p>$tamanhos
+        </div>
+    """)
+
+# TAG sem backups ausentes, mas com tamanho suspeito no backup mais recente
+BLOCO_TAMANHO = Template("""
+        <div style="margin-bottom: 15px; padding: 10px; border: 1px solid #ccc; border-radius: 5px;">
+            <p>TAG: <strong>$tag</strong></p>
+            <p>Responsável: <strong><span style="color: red;">$responsavel</span></strong></p>
+            <p>Setor: <strong>$setor</strong></p>$tamanhos
+        </div>
+    """)
+
+LINHA_TAMANHO = Template("""
+            <p>Tamanho suspeito ($tipo): <strong><span style="color: red;">$tamanho</span></strong> em $arquivo (referência: $referencia)</p>""")
+
+RODAPE = """
+  </body>
+</html>
+"""
+
+def agrupar_faltantes(resultados):
+    # {(aba, tag, responsável, setor): [ResultadoVerificacao]} apenas com os backups ausentes ou corrompidos
+    faltantes = defaultdict(list)
+    for resultado in resultados:
+        if resultado.status == STATUS_OK:
+            continue
+        responsavel = resultado.responsavel or RESPONSAVEL_PADRAO
+        faltantes[(resultado.aba, resultado.tag, responsavel, resultado.setor)].append(resultado)
+    return faltantes
+
+def agrupar_anomalias(anomalias):
+    # Mesmas chaves de agrupar_faltantes, para o bloco da TAG reunir ausências e tamanhos suspeitos
+    por_tag = defaultdict(list)
+    for anomalia in anomalias or ():
+        responsavel = anomalia.responsavel or RESPONSAVEL_PADRAO
+        por_tag[(anomalia.aba, anomalia.tag, responsavel, anomalia.setor)].append(anomalia)
+    return por_tag
+
+def formatar_bytes(tamanho):
+    for unidade in ("B", "KB", "MB", "GB"):
+        if tamanho < 1024:
+            return f"{tamanho:.0f} {unidade}" if unidade == "B" else f"{tamanho:.1f} {unidade}"
+        tamanho /= 1024
+    return f"{tamanho:.1f} TB"
+
+def formatar_tamanhos(anomalias):
+    return "".join(
+        LINHA_TAMANHO.substitute(
+            tipo=escape(anomalia.tipo),
+            tamanho=formatar_bytes(anomalia.tamanho),
+            arquivo=escape(str(anomalia.arquivo)),
+            referencia=formatar_bytes(anomalia.referencia),
+        )
+        for anomalia in anomalias
+    )
+
+def formatar_semana(item):
+    # Backups presentes mas recusados na validação aparecem junto dos ausentes, identificados
+    return f"{item.semana} ({STATUS_CORROMPIDO})" if item.status == STATUS_CORROMPIDO else str(item.semana)
+
+def formatar_intervalo(intervalo):
+    data_inicio, data_fim = intervalo
+    return f"{data_inicio.strftime('%d/%m/%Y')} - {data_fim.strftime('%d/%m/%Y')}"
+
+def escrever_relatorio_html(faltantes, saida, anomalias=None):
+    anomalias = anomalias or {}
+    saida.write(CABECALHO)
+    for (aba, tag, responsavel, setor), itens in faltantes.items():
+        itens = sorted(itens, key=lambda item: item.semana)
+        saida.write(
+            BLOCO_TAG.substitute(
+                tag=escape(str(tag)),
+                responsavel=escape(str(responsavel)),
+                setor=escape(str(setor)),
+                semanas=", ".join(formatar_semana(item) for item in itens),
+                quantidade=len(itens),
+                intervalos=", ".join(formatar_intervalo(item.intervalo) for item in itens),
+                tamanhos=formatar_tamanhos(anomalias.get((aba, tag, responsavel, setor), ())),
+            )
+        )
+    for (aba, tag, responsavel, setor), itens in anomalias.items():
+        if (aba, tag, responsavel, setor) in faltantes:
+            continue
+        saida.write(
+            BLOCO_TAMANHO.substitute(
+                tag=escape(str(tag)),
+                responsavel=escape(str(responsavel)),
+                setor=escape(str(setor)),
+                tamanhos=formatar_tamanhos(itens),
+            )
+        )
+    saida.write(RODAPE)
+
+def renderizar_relatorio_html(faltantes, anomalias=None):
+    saida = io.StringIO()
+    escrever_relatorio_html(faltantes, saida, anomalias)
+    return saida.getvalue()
@@ -1,26 +1,24 @@
+import argparse
 import logging
 import os
 from storage_verificar import main
-from storage_settings import EXCEL_PATH, log_file_path
+from storage_settings import EXCEL_PATH, STORAGE_BASE, LOG_NIVEL, log_file_path
+from log_fila import configurar_log
 from datetime import datetime
 
-# Configurar logging
-logging.basicConfig(
-    filename=log_file_path,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+# Configurar logging (fila + thread de escrita, idempotente)
+configurar_log(log_file_path, LOG_NIVEL)
 
 def run_daily():
     logging.info(f"Iniciando verificação diária. Diretório atual: {os.getcwd()}")
-    logging.info(f"Tentando acessar: \\\\192.168.0.36\\bkp\\VSC")
+    logging.info(f"Tentando acessar: {STORAGE_BASE}")
     try:
         # Verificar se o caminho remoto existe
-        if os.path.exists(r"\\192.168.0.36\bkp\VSC"):
+        if os.path.exists(STORAGE_BASE):
             logging.info("Diretório remoto acessível.")
-            # Listar conteúdo para depuração
-            dir_contents = os.listdir(r"\\192.168.0.36\bkp\VSC")
-            logging.info(f"Conteúdo do diretório: {dir_contents}")
+            # Listar conteúdo só para depuração (LOG_LEVEL=DEBUG)
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(f"Conteúdo do diretório: {os.listdir(STORAGE_BASE)}")
         else:
             logging.error("Diretório remoto não existe ou não está acessível.")
         success = main(
@@ -36,5 +34,21 @@ def run_daily():
     except Exception as e:
         logging.error(f"Erro durante a verificação: {e}", exc_info=True)
 
+def run_watch(excel_paths=None):
+    # Serviço contínuo: verificação completa na partida e a cada dia, depois só as TAGs com backups novos
+    from vigia_storage import VigiaStorage
+    vigia = VigiaStorage(excel_paths or [EXCEL_PATH])
+    try:
+        vigia.executar()
+    except KeyboardInterrupt:
+        vigia.parar()
+
 if __name__ == "__main__":
-    run_daily()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Verificação de backups do storage.")
+    parser.add_argument("--vigiar", action="store_true", help="mantém o processo ativo e atualiza as células à medida que os backups chegam")
+    parser.add_argument("planilhas", nargs="*", help="planilhas monitoradas no modo --vigiar (padrão: EXCEL_PATH)")
+    args = parser.parse_args()
+    if args.vigiar:
+        run_watch(args.planilhas)
+    else:
+        run_daily()
\ No newline at end of file
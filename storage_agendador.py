@@ -0,0 +1,144 @@
+import heapq
+import itertools
+import logging
+import ntpath
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from storage_settings import (
+    MIN_THREADS,
+    MAX_THREADS,
+    THREADS_INICIAIS,
+    MAX_THREADS_POR_SHARE,
+    LATENCIA_ALVO,
+    TAXA_ERRO_MAXIMA,
+    JANELA_AJUSTE,
+)
+
+PRIORIDADE_SEMANA_ATUAL = 0
+PRIORIDADE_NORMAL = 1
+TEMPO_OCIOSO = 60  # segundos até um worker excedente encerrar
+
+_agendador = None
+_agendador_lock = threading.Lock()
+
+def share_do_caminho(caminho):
+    # \\servidor\share no Windows; demais caminhos contam como um único share local
+    drive, _ = ntpath.splitdrive(caminho or "")
+    return drive.lower() if drive.startswith(("\\\\", "//")) else "local"
+
+class AgendadorVarredura:
+    def __init__(
+        self,
+        min_workers=MIN_THREADS,
+        max_workers=MAX_THREADS,
+        workers_iniciais=THREADS_INICIAIS,
+        max_por_share=MAX_THREADS_POR_SHARE,
+        latencia_alvo=LATENCIA_ALVO,
+        taxa_erro_maxima=TAXA_ERRO_MAXIMA,
+        janela=JANELA_AJUSTE,
+    ):
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.max_por_share = max_por_share
+        self.latencia_alvo = latencia_alvo
+        self.taxa_erro_maxima = taxa_erro_maxima
+        self.janela = janela
+        self.alvo = max(min_workers, min(workers_iniciais, max_workers))
+        self.cond = threading.Condition()
+        self.filas = defaultdict(list)  # share -> heap (prioridade, seq, tarefa)
+        self.ativos_por_share = defaultdict(int)
+        self.seq = itertools.count()
+        self.workers = 0
+        self.ocupados = 0
+        self.latencias = []
+        self.erros = 0
+
+    def submit(self, func, *args, prioridade=PRIORIDADE_NORMAL, caminho=None, **kwargs):
+        future = Future()
+        share = share_do_caminho(caminho)
+        with self.cond:
+            heapq.heappush(self.filas[share], (prioridade, next(self.seq), (future, func, args, kwargs)))
+            self._iniciar_workers()
+            self.cond.notify()
+        return future
+
+    def registrar_operacao(self, latencia, erro=False):
+        with self.cond:
+            self.latencias.append(latencia)
+            if erro:
+                self.erros += 1
+            if len(self.latencias) < self.janela:
+                return
+            latencia_media = sum(self.latencias) / len(self.latencias)
+            taxa_erro = self.erros / len(self.latencias)
+            self.latencias = []
+            self.erros = 0
+            alvo_anterior = self.alvo
+            if taxa_erro > self.taxa_erro_maxima or latencia_media > 2 * self.latencia_alvo:
+                self.alvo = max(self.min_workers, self.alvo // 2)
+            elif latencia_media <= self.latencia_alvo and self._pendentes() > 0:
+                self.alvo = min(self.max_workers, self.alvo + 1)
+            if self.alvo != alvo_anterior:
+                logging.info(
+                    f"Agendador: workers {alvo_anterior} -> {self.alvo} "
+                    f"(latência média {latencia_media:.3f}s, taxa de erro {taxa_erro:.0%})"
+                )
+                self._iniciar_workers()
+                self.cond.notify_all()
+
+    def _pendentes(self):
+        return sum(len(fila) for fila in self.filas.values())
+
+    def _iniciar_workers(self):
+        while self.workers < min(self.alvo, self.ocupados + self._pendentes()):
+            self.workers += 1
+            threading.Thread(target=self._worker, name=f"varredura-{self.workers}", daemon=True).start()
+
+    def _proxima_tarefa(self):
+        melhor = None
+        for share, fila in self.filas.items():
+            if fila and self.ativos_por_share[share] < self.max_por_share:
+                if melhor is None or fila[0][:2] < self.filas[melhor][0][:2]:
+                    melhor = share
+        if melhor is None:
+            return None, None
+        return melhor, heapq.heappop(self.filas[melhor])[2]
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                ocioso_desde = time.monotonic()
+                while True:
+                    if self.workers > self.alvo:
+                        self.workers -= 1
+                        return
+                    share, tarefa = self._proxima_tarefa()
+                    if tarefa is not None:
+                        break
+                    if self.workers > self.min_workers and time.monotonic() - ocioso_desde > TEMPO_OCIOSO:
+                        self.workers -= 1
+                        return
+                    self.cond.wait(timeout=TEMPO_OCIOSO)
+                self.ativos_por_share[share] += 1
+                self.ocupados += 1
+            future, func, args, kwargs = tarefa
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(func(*args, **kwargs))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self.cond:
+                    self.ativos_por_share[share] -= 1
+                    self.ocupados -= 1
+                    self.cond.notify_all()
+
+def obter_agendador():
+    global _agendador
+    with _agendador_lock:
+        if _agendador is None:
+            _agendador = AgendadorVarredura()
+        return _agendador
@@ -0,0 +1,134 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from storage_settings import CACHE_MAX_ENTRADAS, CACHE_MAX_BYTES, CACHE_TTL
+
+# Listagem de uma pasta MM-YYYY: arquivos, mtimes da subárvore na captura e custo estimado em bytes
+EntradaCache = namedtuple("EntradaCache", ["arquivos", "mtimes", "tamanho", "validada_em"])
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def tamanho_estimado(arquivos, mtimes):
+    # Aproximação barata: strings de caminho/nome + tupla por arquivo, e as chaves do mapa de mtimes
+    tamanho = sys.getsizeof(arquivos) + sys.getsizeof(mtimes)
+    for arquivo in arquivos:
+        tamanho += sys.getsizeof(arquivo) + sys.getsizeof(arquivo[0]) + sys.getsizeof(arquivo[1]) + 48
+    for pasta in mtimes:
+        tamanho += sys.getsizeof(pasta) + 24
+    return tamanho
+
+def subarvore_inalterada(mtimes):
+    for pasta, mtime in mtimes.items():
+        try:
+            if os.stat(pasta).st_mtime != mtime:
+                return False
+        except OSError:
+            return False
+    return True
+
+class CacheVarredura:
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entradas = OrderedDict()  # caminho -> EntradaCache, da menos para a mais recentemente usada
+        self.bytes = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.expulsoes = 0
+        self.revalidacoes = 0
+        self.invalidacoes = 0
+
+    def obter(self, caminho):
+        with self.lock:
+            entrada = self.entradas.get(caminho)
+            if entrada is None:
+                self.faltas += 1
+                return None
+            if time.monotonic() - entrada.validada_em < self.ttl:
+                self.entradas.move_to_end(caminho)
+                self.acertos += 1
+                return entrada.arquivos
+        # TTL vencido: confere o mtime da pasta e subpastas fora do lock (stat pode ser lento no SMB)
+        valida = subarvore_inalterada(entrada.mtimes)
+        with self.lock:
+            self.revalidacoes += 1
+            if self.entradas.get(caminho) is not entrada:
+                self.faltas += 1
+                return None
+            if not valida:
+                self._remover(caminho)
+                self.invalidacoes += 1
+                self.faltas += 1
+                return None
+            self.entradas[caminho] = entrada._replace(validada_em=time.monotonic())
+            self.entradas.move_to_end(caminho)
+            self.acertos += 1
+            return entrada.arquivos
+
+    def guardar(self, caminho, arquivos, mtimes):
+        tamanho = tamanho_estimado(arquivos, mtimes)
+        with self.lock:
+            if caminho in self.entradas:
+                self._remover(caminho)
+            if tamanho > self.max_bytes:
+                return
+            self.entradas[caminho] = EntradaCache(arquivos, mtimes, tamanho, time.monotonic())
+            self.bytes += tamanho
+            while len(self.entradas) > self.max_entradas or self.bytes > self.max_bytes:
+                antigo = next(iter(self.entradas))
+                self._remover(antigo)
+                self.expulsoes += 1
+
+    def invalidar(self, prefixo=None):
+        with self.lock:
+            if prefixo is None:
+                removidas = len(self.entradas)
+                self.entradas.clear()
+                self.bytes = 0
+            else:
+                chaves = [caminho for caminho in self.entradas if caminho.startswith(prefixo)]
+                for caminho in chaves:
+                    self._remover(caminho)
+                removidas = len(chaves)
+            self.invalidacoes += removidas
+            return removidas
+
+    def invalidar_ancestrais(self, caminho):
+        # Remove as entradas cujas listagens incluem `caminho` (a pasta MM-YYYY acima dele)
+        with self.lock:
+            chaves = [
+                pasta for pasta in self.entradas
+                if caminho == pasta or caminho.startswith(pasta.rstrip(os.sep) + os.sep)
+            ]
+            for pasta in chaves:
+                self._remover(pasta)
+            self.invalidacoes += len(chaves)
+            return len(chaves)
+
+    def _remover(self, caminho):
+        entrada = self.entradas.pop(caminho)
+        self.bytes -= entrada.tamanho
+
+    def estatisticas(self):
+        with self.lock:
+            return {
+                "entradas": len(self.entradas),
+                "bytes": self.bytes,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "expulsoes": self.expulsoes,
+                "revalidacoes": self.revalidacoes,
+                "invalidacoes": self.invalidacoes,
+            }
+
+def obter_cache_varredura():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheVarredura()
+        return _cache
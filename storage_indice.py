@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import threading
+import logging
+from collections import defaultdict, namedtuple
+from storage_settings import INDEX_DB_PATH
+from metricas import obter_metricas
+
+# Entrada de uma pasta como gravada no índice (mtime/tamanho capturados no scandir)
+EntradaIndice = namedtuple("EntradaIndice", ["nome", "is_dir", "mtime", "tamanho"])
+
+_indice = None
+_indice_lock = threading.Lock()
+
+def varrer_pasta(caminho_pasta):
+    entradas = []
+    with os.scandir(caminho_pasta) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+                stat = entry.stat()
+            except OSError as e:
+                logging.warning(f"Erro ao ler entrada {entry.path}: {e}")
+                continue
+            entradas.append(EntradaIndice(entry.name, is_dir, stat.st_mtime, 0 if is_dir else stat.st_size))
+    obter_metricas().contar("stats", len(entradas))
+    return entradas
+
+class IndiceStorage:
+    def __init__(self, caminho_db=INDEX_DB_PATH):
+        self.caminho_db = caminho_db
+        self.lock = threading.Lock()
+        self.acertos = 0
+        self.revarreduras = 0
+        try:
+            self.conn = sqlite3.connect(caminho_db, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao abrir o índice {caminho_db}, usando índice em memória: {e}")
+            self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pastas (
+                caminho TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                varrida_em REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entradas (
+                pasta TEXT NOT NULL,
+                nome TEXT NOT NULL,
+                is_dir INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                tamanho INTEGER NOT NULL,
+                PRIMARY KEY (pasta, nome)
+            );
+            """
+        )
+        self.conn.commit()
+
+    def listar(self, caminho_pasta):
+        # Uma única ida ao storage (stat da pasta) quando a pasta não mudou desde a última varredura
+        obter_metricas().contar("stats")
+        try:
+            mtime_pasta = os.stat(caminho_pasta).st_mtime
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            linha = self.conn.execute(
+                "SELECT mtime FROM pastas WHERE caminho = ?", (caminho_pasta,)
+            ).fetchone()
+            if linha is not None and linha[0] == mtime_pasta:
+                self.acertos += 1
+                obter_metricas().contar("pastas_do_indice")
+                return [
+                    EntradaIndice(nome, bool(is_dir), mtime, tamanho)
+                    for nome, is_dir, mtime, tamanho in self.conn.execute(
+                        "SELECT nome, is_dir, mtime, tamanho FROM entradas WHERE pasta = ?",
+                        (caminho_pasta,),
+                    )
+                ]
+        try:
+            entradas = varrer_pasta(caminho_pasta)
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            self.revarreduras += 1
+            obter_metricas().contar("pastas_revarridas")
+            with self.conn:
+                self.conn.execute("DELETE FROM entradas WHERE pasta = ?", (caminho_pasta,))
+                self.conn.executemany(
+                    "INSERT INTO entradas (pasta, nome, is_dir, mtime, tamanho) VALUES (?, ?, ?, ?, ?)",
+                    [(caminho_pasta, e.nome, int(e.is_dir), e.mtime, e.tamanho) for e in entradas],
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO pastas (caminho, mtime, varrida_em) VALUES (?, ?, strftime('%s', 'now'))",
+                    (caminho_pasta, mtime_pasta),
+                )
+        return entradas
+
+    def arquivos_sob(self, caminho_pasta):
+        # Arquivos de todas as subpastas já indexadas (inclusive meses anteriores), sem tocar no storage.
+        # Só valem pastas ainda listadas na pasta acima: as linhas de subpastas apagadas ficam no índice
+        # até alguém listá-las de novo
+        caminho_pasta = caminho_pasta.rstrip(os.sep)
+        prefixo = caminho_pasta + os.sep
+        fim = caminho_pasta + chr(ord(os.sep) + 1)
+        with self.lock:
+            linhas = self.conn.execute(
+                "SELECT pasta, nome, is_dir, mtime, tamanho FROM entradas "
+                "WHERE pasta = ? OR (pasta >= ? AND pasta < ?)",
+                (caminho_pasta, prefixo, fim),
+            ).fetchall()
+        subpastas = defaultdict(list)
+        arquivos = []
+        for pasta, nome, is_dir, mtime, tamanho in linhas:
+            if is_dir:
+                subpastas[pasta].append(os.path.join(pasta, nome))
+            elif pasta != caminho_pasta:
+                arquivos.append((pasta, EntradaIndice(nome, False, mtime, tamanho)))
+        vivas = set()
+        pendentes = list(subpastas[caminho_pasta])
+        while pendentes:
+            pasta = pendentes.pop()
+            if pasta not in vivas:
+                vivas.add(pasta)
+                pendentes.extend(subpastas[pasta])
+        return [(pasta, entrada) for pasta, entrada in arquivos if pasta in vivas]
+
+    def atualizar_entrada(self, caminho_pasta, nome, mtime, tamanho):
+        # Arquivo alterado no lugar (ex.: cópia concluída) sem mudar o mtime da pasta
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE entradas SET mtime = ?, tamanho = ? WHERE pasta = ? AND nome = ?",
+                (mtime, tamanho, caminho_pasta, nome),
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def obter_indice():
+    global _indice
+    with _indice_lock:
+        if _indice is None:
+            _indice = IndiceStorage()
+            logging.info(f"Índice do storage aberto em: {_indice.caminho_db}")
+        return _indice
@@ -1,4 +1,5 @@
 import logging
+from log_fila import configurar_log
 import sys
 import os
 from dotenv import load_dotenv
@@ -13,6 +14,8 @@ smtp_user = os.getenv("SMTP_USER")
 smtp_pass = os.getenv("SMTP_PASS")
 from_email = os.getenv("FROM_EMAIL")
 to_email = os.getenv("TO_EMAIL")
+smtp_starttls = os.getenv("SMTP_STARTTLS", "1") != "0"  # 0 para servidor local de testes (ex.: aiosmtpd)
+enviar_consolidado = os.getenv("ENVIAR_CONSOLIDADO", "1") != "0"
 
 # LOG na pasta raiz
 if getattr(sys, "frozen", False):
@@ -25,17 +28,74 @@ else:
 # Caminho completo do log
 log_file_path = os.path.join(main_dir, "log.log")
 
-logging.basicConfig(
-    filename=log_file_path,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    encoding="utf-8",
-)
+# Mapa responsável/setor -> e-mail(s) para os resumos individuais
+DESTINATARIOS_PATH = os.path.join(main_dir, "destinatarios.json")
+
+# Resumo de cada execução: JSON e textfile do Prometheus (node_exporter --collector.textfile)
+METRICAS_JSON_PATH = os.path.join(main_dir, "metricas_execucao.json")
+METRICAS_PROM_PATH = os.path.join(main_dir, "bkp_verificacao.prom")
+METRICAS_PASTAS_LENTAS = 20  # pastas mais lentas listadas no JSON
+
+# Diário das verificações em andamento (retomada após interrupção)
+CHECKPOINT_DIR = main_dir
+
+# Índice persistente da varredura do storage (SQLite ao lado do log)
+INDEX_DB_PATH = os.path.join(main_dir, "indice_storage.db")
+
+# Resultado da validação de integridade de cada backup, por (caminho, tamanho, mtime)
+VALIDACAO_DB_PATH = os.path.join(main_dir, "validacao_backups.db")
+
+# Histórico consultável dos resultados de cada execução (SQLite em WAL: leitura sem bloquear a gravação)
+HISTORICO_DB_PATH = os.path.join(main_dir, "historico_resultados.db")
+HISTORICO_RESULTADOS = True
+
+# LOG_LEVEL=DEBUG inclui as listagens completas de diretórios no log
+LOG_NIVEL = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper())
+if not isinstance(LOG_NIVEL, int):
+    LOG_NIVEL = logging.INFO
+PROGRESSO_LOG_INTERVALO = 5  # segundos entre mensagens de progresso no log
+PROGRESSO_GUI_INTERVALO = 100  # ms entre atualizações da barra de progresso
+ORCAMENTO_INICIALIZACAO = 1.5  # segundos até a janela aparecer; acima disso o log registra um aviso
+
+configurar_log(log_file_path, LOG_NIVEL)
 
 MAX_RETRIES = 3
 RETRY_DELAY = 2  # segundos
 NETWORK_TIMEOUT = 30  # segundos
-MAX_THREADS = 5
+# Agendador de varredura: ajusta os workers pela latência/erros observados no storage
+MIN_THREADS = 2
+THREADS_INICIAIS = 5
+MAX_THREADS = 32
+MAX_THREADS_POR_SHARE = 16
+LATENCIA_ALVO = 0.25  # segundos por listagem de pasta
+TAXA_ERRO_MAXIMA = 0.05
+JANELA_AJUSTE = 20  # listagens observadas entre ajustes
+MAX_PROFUNDIDADE = 3  # níveis de subpastas percorridos abaixo de cada pasta MM-YYYY
+CACHE_MAX_ENTRADAS = 5000  # pastas MM-YYYY mantidas no cache de varredura
+CACHE_MAX_BYTES = 64 * 1024 * 1024  # estimativa de memória das listagens em cache
+CACHE_TTL = 600  # segundos; depois disso a entrada é revalidada pelo mtime das pastas
+
+SMTP_MAX_CONEXOES = 2
+SMTP_MAX_TENTATIVAS = 3
+SMTP_BACKOFF = 2  # segundos, dobra a cada nova tentativa
+
+MAX_PLANILHAS_PARALELAS = 4  # planilhas lidas/gravadas ao mesmo tempo no modo em lote
+VIGIA_INTERVALO = 300  # segundos entre verificações de mtime das pastas no modo vigia
+VIGIA_USAR_NOTIFICACOES = True  # usa watchdog (se instalado) quando o storage não é um share SMB
+
+# Validação de integridade dos backups encontrados (tamanho, diretório central do ZIP, blocos do RAR)
+VALIDAR_BACKUPS = os.getenv("VALIDAR_BACKUPS", "0") == "1"
+VALIDACAO_HASH = os.getenv("VALIDACAO_HASH", "0") == "1"  # SHA-256 do conteúdo: lê o arquivo inteiro
+VALIDACAO_PROCESSOS = min(4, os.cpu_count() or 1)
+VALIDACAO_TAMANHO_MINIMO = 100  # bytes; abaixo disso o backup é considerado corrompido
+
+# Análise do histórico de tamanhos por TAG (um backup por semana, lido do índice do storage)
+ANALISE_TAMANHOS = os.getenv("ANALISE_TAMANHOS", "1") != "0"
+ANALISE_JANELA = 8  # semanas anteriores comparadas com o backup mais recente
+ANALISE_MIN_AMOSTRAS = 4  # semanas anteriores necessárias para avaliar a TAG
+ANALISE_LIMIAR_QUEDA = 0.5  # último backup menor que 50% do anterior
+ANALISE_LIMIAR_MAD = 6.0  # desvios absolutos medianos até a mediana móvel
+ANALISE_TENDENCIA_QUEDA = 0.05  # queda média de 5% do tamanho por semana
 
 EXCEL_PATH = r"C:\Users\antoni.demetrius\OneDrive\Documentos\backup_auto\excel\Acompanhamento de Backups 2025.xlsx"
 STORAGE_BASE = r"\\192.168.0.36\bkp\VSC"
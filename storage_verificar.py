@@ -1,21 +1,38 @@
 import openpyxl
-from openpyxl.styles import PatternFill, Font, Alignment
 from datetime import datetime, timedelta
 import os
-import re
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 from storage_settings import *
+from storage_indice import obter_indice
+from storage_cache import obter_cache_varredura
+from metricas import iniciar_metricas, obter_metricas
+from diario_verificacao import DiarioVerificacao
+from validacao_backup import validar_backups
+from analise_tamanhos import analisar_abas
+from historico_resultados import registrar_resultados
+from correspondencia_semanas import mais_recente_por_semana
+from planilha_layout import TabelaPlanilha, ResultadoVerificacao, parse_interval
+from relatorio_email import agrupar_faltantes, agrupar_anomalias
+from envio_email import enviar_relatorios
+from planilha_escrita import (
+    AlteracaoCelula,
+    STATUS_OK,
+    STATUS_NAO_ENCONTRADO,
+    STATUS_CORROMPIDO,
+    STATUS_REVERIFICAVEIS,
+    caminho_verde,
+    caminho_vermelho,
+    gravar_alteracoes,
+)
+from storage_agendador import obter_agendador, PRIORIDADE_SEMANA_ATUAL, PRIORIDADE_NORMAL
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, wait, FIRST_COMPLETED
 from dateutil.relativedelta import relativedelta
 import threading
 import logging
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
-file_cache = {}
-cache_lock = threading.Lock()
+# Registro compacto de um arquivo de backup, capturado uma única vez na listagem
+ArquivoBackup = namedtuple("ArquivoBackup", ["caminho", "nome", "mtime", "tamanho"])
 
 def retry(func, *args, **kwargs):
     stop_event = kwargs.pop('stop_event', None)
@@ -28,6 +45,7 @@ def retry(func, *args, **kwargs):
         except Exception as e:
             if attempt == MAX_RETRIES - 1:
                 raise e
+            obter_metricas().contar("retentativas")
             logging.warning(
                 f"Tentativa {attempt + 1} falhou. Tentando novamente em {RETRY_DELAY} segundos: {e}"
             )
@@ -43,227 +61,398 @@ def get_month_weeks(year, month):
         current_date += timedelta(days=1)
     return sorted(weeks)
 
-def parse_interval(interval_str, current_year, current_month):
+def listar_pasta(caminho_pasta, stop_event=None):
+    inicio = time.perf_counter()
     try:
-        if not interval_str:
-            return None, None
-        clean_str = re.sub(r"DIA\s*", "", str(interval_str).upper()).strip()
-        parts = re.split(r"\s*-\s*", clean_str)
-        if len(parts) != 2:
-            return None, None
-        start_day = int(parts[0])
-        end_day = int(parts[1])
-        if start_day > end_day:
-            prev_month = current_month - 1
-            prev_year = current_year
-            if prev_month == 0:
-                prev_month = 12
-                prev_year -= 1
-            start_date = datetime(prev_year, prev_month, start_day)
-            end_date = datetime(current_year, current_month, end_day)
-        else:
-            start_date = datetime(current_year, current_month, start_day)
-            end_date = datetime(current_year, current_month, end_day)
-        return start_date.date(), end_date.date()
-    except (ValueError, TypeError) as e:
-        logging.error(f"Erro ao parsear intervalo '{interval_str}': {e}")
-        return None, None
-
-def buscar_arquivos_e_acessar_pastas(caminho_pasta, stop_event=None):
+        entradas = retry(obter_indice().listar, caminho_pasta, stop_event=stop_event)
+    except InterruptedError:
+        raise
+    except Exception:
+        obter_agendador().registrar_operacao(time.perf_counter() - inicio, erro=True)
+        raise
+    latencia = time.perf_counter() - inicio
+    obter_agendador().registrar_operacao(latencia)
+    obter_metricas().registrar_pasta(caminho_pasta, latencia)
+    return entradas
+
+def buscar_arquivos_e_acessar_pastas(caminho_pasta, stop_event=None, profundidade=MAX_PROFUNDIDADE, erros=None):
     if stop_event and stop_event.is_set():
         logging.info(f"Varredura interrompida na pasta: {caminho_pasta}")
         return []
-    with cache_lock:
-        if caminho_pasta in file_cache:
-            return file_cache[caminho_pasta]
+    cache = obter_cache_varredura()
+    arquivos = cache.obter(caminho_pasta)
+    if arquivos is not None:
+        obter_metricas().contar("cache_acertos")
+        return arquivos
+    obter_metricas().contar("cache_faltas")
     arquivos = []
     try:
-        if not retry(os.path.exists, caminho_pasta, stop_event=stop_event):
+        # mtimes da subárvore no momento da listagem, usados pelo cache para revalidar a entrada
+        try:
+            mtimes = {caminho_pasta: os.stat(caminho_pasta).st_mtime}
+        except FileNotFoundError:
             logging.warning(f"Pasta não encontrada: {caminho_pasta}")
             return []
-        for root, dirs, files in os.walk(caminho_pasta, topdown=True):
+        pendentes = [(caminho_pasta, 0)]
+        while pendentes:
+            root, nivel = pendentes.pop()
             if stop_event and stop_event.is_set():
                 logging.info(f"Varredura interrompida na subpasta: {root}")
                 return []
-            for file in files:
-                if os.path.splitext(file)[1].lower() in BACKUP_EXT:
-                    full_path = os.path.join(root, file)
-                    arquivos.append(full_path)
-        with cache_lock:
-            file_cache[caminho_pasta] = arquivos
+            entradas = listar_pasta(root, stop_event=stop_event)
+            if entradas is None:
+                if root == caminho_pasta:
+                    logging.warning(f"Pasta não encontrada: {caminho_pasta}")
+                    return []
+                continue
+            for entrada in entradas:
+                if entrada.is_dir:
+                    if nivel < profundidade:
+                        subpasta = os.path.join(root, entrada.nome)
+                        mtimes[subpasta] = entrada.mtime
+                        pendentes.append((subpasta, nivel + 1))
+                elif os.path.splitext(entrada.nome)[1].lower() in BACKUP_EXT:
+                    full_path = os.path.join(root, entrada.nome)
+                    arquivos.append(ArquivoBackup(full_path, entrada.nome, entrada.mtime, entrada.tamanho))
+        cache.guardar(caminho_pasta, arquivos, mtimes)
+        obter_metricas().contar("arquivos", len(arquivos))
         return arquivos
     except FileNotFoundError:
         logging.error(f"A pasta '{caminho_pasta}' não foi encontrada.")
+        if erros is not None:
+            erros.append(caminho_pasta)
         return []
     except PermissionError:
         logging.error(f"Permissão negada para acessar a pasta '{caminho_pasta}'.")
+        if erros is not None:
+            erros.append(caminho_pasta)
         return []
     except Exception as e:
         logging.error(f"Erro ao acessar a pasta {caminho_pasta}: {e}")
+        if erros is not None:
+            erros.append(caminho_pasta)
         return []
 
-def buscar_arquivos_em_paralelo(caminhos_pastas, stop_event=None):
-    resultados = {}
-    with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
-        future_to_path = {
-            executor.submit(buscar_arquivos_e_acessar_pastas, caminho, stop_event): caminho
-            for caminho, _ in caminhos_pastas
-        }
-        for future in as_completed(future_to_path):
+def meses_da_semana(data):
+    # Pastas MM-YYYY que cobrem a semana de `data` (duas quando a semana vira o mês)
+    inicio_semana = data - timedelta(days=data.weekday())
+    return {inicio_semana.strftime("%m-%Y"), (inicio_semana + timedelta(days=6)).strftime("%m-%Y")}
+
+def normalizar_nome(nome):
+    return str(nome).strip().casefold()
+
+def listar_subpastas(caminho_pasta, stop_event=None):
+    entradas = listar_pasta(caminho_pasta, stop_event=stop_event)
+    if entradas is None:
+        return None
+    return {normalizar_nome(entrada.nome): entrada.nome for entrada in entradas if entrada.is_dir}
+
+def planejar_varredura(linhas, meses_envolvidos, stop_event=None):
+    # Resolve <ano>/<setor>/<tag> pelas listagens dos pais, sem exists() por pasta de mês
+    meses_por_ano = defaultdict(set)
+    for mes_ano in meses_envolvidos:
+        meses_por_ano[mes_ano.split("-")[1]].add(mes_ano)
+    listagens = {}
+    pastas_tag = {}
+    plano = defaultdict(set)
+    for setor, tag in linhas:
+        for ano, meses in meses_por_ano.items():
             if stop_event and stop_event.is_set():
-                logging.info("Busca paralela interrompida.")
-                executor.shutdown(wait=False)
-                return resultados
-            caminho = future_to_path[future]
-            try:
-                resultados[caminho] = future.result(timeout=NETWORK_TIMEOUT)
-            except Exception as e:
-                logging.error(f"Erro ao processar pasta {caminho}: {e}")
-                resultados[caminho] = []
+                logging.info("Planejamento da varredura interrompido.")
+                return pastas_tag, plano
+            caminho = os.path.join(STORAGE_BASE, ano)
+            for componente in [*str(setor).split("/"), *str(tag).split("/")]:
+                if caminho not in listagens:
+                    # Falha de acesso em <ano>/<setor> fica restrita a essa subárvore, como em _varrer_tag
+                    try:
+                        listagens[caminho] = listar_subpastas(caminho, stop_event=stop_event)
+                    except PermissionError:
+                        logging.error(f"Permissão negada para acessar a pasta '{caminho}'.")
+                        listagens[caminho] = None
+                    except Exception as e:
+                        logging.error(f"Erro ao acessar a pasta {caminho}: {e}")
+                        listagens[caminho] = None
+                subpastas = listagens[caminho]
+                if subpastas is None or normalizar_nome(componente) not in subpastas:
+                    caminho = None
+                    break
+                caminho = os.path.join(caminho, subpastas[normalizar_nome(componente)])
+            if caminho is None:
+                logging.warning(f"Pasta não encontrada: {os.path.join(STORAGE_BASE, ano, setor, tag)}")
+                continue
+            pastas_tag[(ano, setor, tag)] = caminho
+            plano[caminho].update(meses)
+    return pastas_tag, plano
+
+def varrer_tag(caminho_tag, meses, stop_event=None, erros=None):
+    # Tempo somado entre os workers do agendador (trabalho de varredura, não tempo de parede)
+    with obter_metricas().fase("varredura_pastas"):
+        return _varrer_tag(caminho_tag, meses, stop_event, erros)
+
+def _varrer_tag(caminho_tag, meses, stop_event=None, erros=None):
+    # `erros` recebe as pastas que falharam, para não confundir falha de acesso com pasta vazia
+    resultados = {}
+    try:
+        subpastas = listar_subpastas(caminho_tag, stop_event=stop_event)
+    except Exception as e:
+        logging.error(f"Erro ao acessar a pasta {caminho_tag}: {e}")
+        if erros is not None:
+            erros.append(caminho_tag)
+        subpastas = None
+    if subpastas is None:
+        return {mes_ano: [] for mes_ano in meses}
+    for mes_ano in meses:
+        nome_mes = subpastas.get(normalizar_nome(mes_ano))
+        if nome_mes is None:
+            logging.warning(f"Pasta não encontrada: {os.path.join(caminho_tag, mes_ano)}")
+            resultados[mes_ano] = []
+            continue
+        resultados[mes_ano] = buscar_arquivos_e_acessar_pastas(
+            os.path.join(caminho_tag, nome_mes), stop_event, erros=erros
+        )
     return resultados
 
-def caminho_verde(dados_adicionados, arquivo_nome, arquivo_caminho, celula):
-    celula.fill = PatternFill(start_color="00FF00", end_color="00FF00", fill_type="solid")
-    celula.value = dados_adicionados
-    celula.font = Font(color="000000", bold=False)
-    celula.alignment = Alignment(horizontal="center", vertical="center")
-
-def caminho_vermelho(celula):
-    celula.fill = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
-    celula.value = "NOT FOUND"
-    celula.font = Font(color="FFFFFF", bold=True)
-    celula.alignment = Alignment(horizontal="center", vertical="center")
-
-def encontrar_coluna_semana(ws, semana):
-    for col in range(6, ws.max_column + 1):
-        header_value = ws.cell(row=2, column=col).value
-        if header_value is not None:
-            match = re.search(r"(?:Semana\s*|\s*)(\d+)(?:\s*ª|\s*)", str(header_value), re.IGNORECASE)
-            if match:
-                semana_num = int(match.group(1))
-                if semana_num == semana:
-                    return col
-    return None
-
-def enviar_email_notificacao(wb, stop_event=None):
+# Aba já planejada: folders da varredura enviados ao agendador, aguardando o casamento
+AbaPlanejada = namedtuple(
+    "AbaPlanejada",
+    ["nome", "tabela", "layout", "intervalos_por_semana", "meses_envolvidos", "pastas_tag", "chaves"],
+)
+
+class PipelineVerificacao:
+    def __init__(self, stop_event=None, meses_prioritarios=(), canal=None, diario=None):
+        self.stop_event = stop_event
+        self.canal = canal
+        self.diario = diario
+        self.meses_prioritarios = set(meses_prioritarios)
+        self.agendador = obter_agendador()
+        self.tarefas = {}  # (caminho_tag, mes_ano) -> Future
+        self.resultados = {}  # (caminho_tag, mes_ano) -> [ArquivoBackup]
+        self.abas_pendentes = []
+        self.lock = threading.Lock()  # várias planilhas podem planejar sobre o mesmo pipeline
+
+    def submeter(self, plano):
+        chaves = set()
+        with self.lock:
+            for caminho, meses in plano.items():
+                chaves.update((caminho, mes_ano) for mes_ano in meses)
+                novos = {mes_ano for mes_ano in meses if (caminho, mes_ano) not in self.tarefas}
+                if not novos:
+                    continue
+                prioridade = PRIORIDADE_SEMANA_ATUAL if novos & self.meses_prioritarios else PRIORIDADE_NORMAL
+                future = self.agendador.submit(
+                    self._varrer, caminho, novos, prioridade=prioridade, caminho=caminho
+                )
+                for mes_ano in novos:
+                    self.tarefas[(caminho, mes_ano)] = future
+                if self.canal:
+                    self.canal.tarefas_planejadas(1)
+        return chaves
+
+    def _varrer(self, caminho, meses):
+        resultado = {}
+        erros = []
+        try:
+            resultado = varrer_tag(caminho, meses, self.stop_event, erros)
+            # Só entra no diário a varredura completa: interrompida ou com erro será refeita
+            if self.diario and not erros and not (self.stop_event and self.stop_event.is_set()):
+                self.diario.registrar_pastas(caminho, resultado)
+            return resultado
+        finally:
+            if self.canal:
+                self.canal.tarefa_concluida(len(resultado), sum(len(arquivos) for arquivos in resultado.values()))
+
+    def precarregar(self, resultados):
+        # Pastas retomadas do diário: entram como tarefas já concluídas e não são varridas de novo
+        with self.lock:
+            for (caminho, mes_ano), arquivos in resultados.items():
+                future = Future()
+                future.set_result({mes_ano: arquivos})
+                self.tarefas[(caminho, mes_ano)] = future
+                self.resultados[(caminho, mes_ano)] = arquivos
+
+    def adicionar_aba(self, aba):
+        self.abas_pendentes.append(aba)
+
+    def arquivos(self, caminho_tag, mes_ano):
+        chave = (caminho_tag, mes_ano)
+        with self.lock:
+            future = self.tarefas.get(chave)
+            if future is None:
+                return []
+            if chave in self.resultados:
+                return self.resultados[chave]
+        try:
+            resultado = future.result()
+        except Exception as e:
+            logging.error(f"Erro ao processar pasta {caminho_tag}: {e}")
+            resultado = {}
+        with self.lock:
+            for mes, arquivos in resultado.items():
+                self.resultados[(caminho_tag, mes)] = arquivos
+            return self.resultados.setdefault(chave, [])
+
+    def abas_prontas(self, bloquear=False):
+        while self.abas_pendentes:
+            prontas = [aba for aba in self.abas_pendentes if all(self.tarefas[c].done() for c in aba.chaves)]
+            for aba in prontas:
+                self.abas_pendentes.remove(aba)
+                yield aba
+            if not bloquear or not self.abas_pendentes:
+                return
+            if self.stop_event and self.stop_event.is_set():
+                return
+            aguardando = {
+                self.tarefas[c] for aba in self.abas_pendentes for c in aba.chaves if not self.tarefas[c].done()
+            }
+            wait(aguardando, timeout=1, return_when=FIRST_COMPLETED)
+
+    def cancelar(self):
+        for future in set(self.tarefas.values()):
+            future.cancel()
+
+def planejar_aba(tabela, semanas_a_verificar, pipeline, stop_event=None, intervalos_por_semana=None):
+    layout = tabela.layout
+    if intervalos_por_semana is None:
+        intervalos_por_semana = layout.intervalos(semanas_a_verificar)
+    meses_envolvidos = set()
+    for start_date, end_date in intervalos_por_semana.values():
+        meses_envolvidos.add(start_date.strftime("%m-%Y"))
+        meses_envolvidos.add(end_date.strftime("%m-%Y"))
+    pastas_tag, plano = planejar_varredura(
+        {(linha.setor, linha.tag) for linha in layout.linhas}, meses_envolvidos, stop_event=stop_event
+    )
     if stop_event and stop_event.is_set():
-        logging.info("Envio de e-mail interrompido pelo usuário.")
-        return False
-    missing_backups = defaultdict(lambda: {"semanas": [], "intervalos": []})
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        intervalos_por_semana = {}
-        for col in range(6, ws.max_column + 1):
-            if stop_event and stop_event.is_set():
-                logging.info(f"Verificação de intervalos interrompida na aba: {sheet_name}")
-                return False
-            header_value = ws.cell(row=2, column=col).value
-            if header_value is not None:
-                match = re.search(r"(?:Semana\s*|\s*)(\d+)(?:\s*ª|\s*)", str(header_value), re.IGNORECASE)
-                if match:
-                    semana = int(match.group(1))
-                    interval_str = ws.cell(row=3, column=col).value
-                    start_date, end_date = parse_interval(interval_str, datetime.now().year, datetime.now().month)
-                    if start_date and end_date:
-                        intervalos_por_semana[semana] = (start_date, end_date)
-        for col in range(6, ws.max_column + 1):
-            if stop_event and stop_event.is_set():
-                logging.info(f"Verificação de backups ausentes interrompida na aba: {sheet_name}")
-                return False
-            header_value = ws.cell(row=2, column=col).value
-            if header_value is not None:
-                match = re.search(r"(?:Semana\s*|\s*)(\d+)(?:\s*ª|\s*)", str(header_value), re.IGNORECASE)
-                if match:
-                    semana = int(match.group(1))
-                    for row in range(4, ws.max_row + 1):
-                        if stop_event and stop_event.is_set():
-                            logging.info(f"Verificação de backups ausentes interrompida na aba: {sheet_name}")
-                            return False
-                        cell = ws.cell(row=row, column=col)
-                        if cell.value == "NOT FOUND":
-                            tag = ws.cell(row=row, column=1).value
-                            responsible = ws.cell(row=row, column=2).value or "Não especificado"
-                            setor = ws.cell(row=row, column=3).value
-                            if tag and setor:
-                                key = (sheet_name, tag, responsible, setor)
-                                if semana in intervalos_por_semana:
-                                    start_date, end_date = intervalos_por_semana[semana]
-                                    missing_backups[key]["semanas"].append(semana)
-                                    missing_backups[key]["intervalos"].append(
-                                        f"{start_date.strftime('%d/%m/%Y')} - {end_date.strftime('%d/%m/%Y')}"
-                                    )
-                                    missing_backups[key].update({
-                                        "sheet": sheet_name,
-                                        "tag": tag,
-                                        "responsible": responsible,
-                                        "setor": setor,
-                                    })
+        logging.info(f"Verificação interrompida ao planejar a aba: {layout.nome}")
+        return None
+    chaves = pipeline.submeter(plano)
+    return AbaPlanejada(layout.nome, tabela, layout, intervalos_por_semana, meses_envolvidos, pastas_tag, chaves)
+
+def verificar_aba(aba, pipeline, semanas_a_verificar, ano_atual, alteracoes, resultados, stop_event=None, ano_planilha=None):
+    tabela = aba.tabela
+    decididas = set()
+    arquivos_por_linha = {}
+    for linha in aba.layout.linhas:
+        arquivos = []
+        for mes_ano in aba.meses_envolvidos:
+            mes, ano = mes_ano.split("-")
+            caminho_tag = aba.pastas_tag.get((ano, linha.setor, linha.tag))
+            if caminho_tag is not None:
+                arquivos.extend(pipeline.arquivos(caminho_tag, mes_ano))
+        arquivos_por_linha[linha.linha] = arquivos
+    mais_recentes = mais_recente_por_semana(arquivos_por_linha, aba.intervalos_por_semana, ano=ano_atual)
+
+    def celula_pendente(numero_linha, semana):
+        coluna = aba.layout.coluna_por_semana.get(semana)
+        if coluna is None or semana not in aba.intervalos_por_semana:
+            return None
+        valor_atual = tabela.valor(numero_linha, coluna)
+        if valor_atual is not None and valor_atual not in STATUS_REVERIFICAVEIS:
+            return None
+        return coluna
+
+    validacoes = {}
+    if VALIDAR_BACKUPS:
+        # Só os arquivos que vão decidir uma célula; os já validados vêm do cache
+        semanas = set(semanas_a_verificar)
+        validacoes = validar_backups(
+            [
+                arquivo for (numero_linha, semana), arquivo in mais_recentes.items()
+                if semana in semanas and celula_pendente(numero_linha, semana) is not None
+            ],
+            stop_event=stop_event,
+        )
+    for linha in aba.layout.linhas:
+        if stop_event and stop_event.is_set():
+            logging.info(f"Verificação interrompida ao processar linhas da aba: {aba.nome}")
+            return False
+        for semana in semanas_a_verificar:
+            coluna = celula_pendente(linha.linha, semana)
+            if coluna is None:
+                continue
+            decididas.add((linha.linha, coluna))
+            intervalo = aba.intervalos_por_semana[semana]
+            arquivo_mais_recente = mais_recentes.get((linha.linha, semana))
+            if arquivo_mais_recente is None:
+                alteracoes.append(AlteracaoCelula(aba.nome, linha.linha, coluna, STATUS_NAO_ENCONTRADO, STATUS_NAO_ENCONTRADO))
+                resultados.append(ResultadoVerificacao(
+                    aba.nome, linha.tag, linha.responsavel, linha.setor, semana, intervalo, STATUS_NAO_ENCONTRADO, None
+                ))
+                tabela.definir(linha.linha, coluna, STATUS_NAO_ENCONTRADO)
+                continue
+            validacao = validacoes.get(arquivo_mais_recente.caminho)
+            if validacao is not None and not validacao.valido:
+                alteracoes.append(AlteracaoCelula(aba.nome, linha.linha, coluna, STATUS_CORROMPIDO, STATUS_CORROMPIDO))
+                resultados.append(ResultadoVerificacao(
+                    aba.nome, linha.tag, linha.responsavel, linha.setor, semana, intervalo, STATUS_CORROMPIDO, arquivo_mais_recente
+                ))
+                tabela.definir(linha.linha, coluna, STATUS_CORROMPIDO)
+                continue
+            data_str = datetime.fromtimestamp(arquivo_mais_recente.mtime).strftime(DATA_FORMATO)
+            alteracoes.append(AlteracaoCelula(aba.nome, linha.linha, coluna, data_str, STATUS_OK))
+            resultados.append(ResultadoVerificacao(
+                aba.nome, linha.tag, linha.responsavel, linha.setor, semana, intervalo, STATUS_OK, arquivo_mais_recente
+            ))
+            tabela.definir(linha.linha, coluna, data_str)
+    # Células já marcadas como NOT FOUND/CORROMPIDO em semanas fora desta verificação continuam no relatório.
+    # intervalo_por_semana aplica o mês corrente a todas as semanas; as datas vêm do mês do cabeçalho
+    pendentes = [celula for celula in tabela.nao_encontrados if celula not in decididas]
+    ano_planilha = ano_planilha or ano_atual
+    if not pendentes or ano_planilha is None:
+        return True
+    intervalos_reais = aba.layout.intervalos_reais(ano_planilha)
+    for numero_linha, coluna in pendentes:
+        semana = aba.layout.semana_por_coluna[coluna]
+        if semana not in intervalos_reais:
+            continue
+        linha = aba.layout.linhas[tabela.posicao[numero_linha]]
+        resultados.append(ResultadoVerificacao(
+            aba.nome, linha.tag, linha.responsavel, linha.setor, semana,
+            intervalos_reais[semana], tabela.valor(numero_linha, coluna), None,
+        ))
+    return True
+
+def enviar_email_notificacao(resultados, stop_event=None, anomalias=None):
     if stop_event and stop_event.is_set():
-        logging.info("Email interrompido pelo usuário antes de construir o corpo do e-mail.")
+        logging.info("Envio de e-mail interrompido pelo usuário.")
         return False
-    if not missing_backups:
-        logging.info("Nenhum backup ausente encontrado. Nenhum email enviado.")
+    missing_backups = agrupar_faltantes(resultados)
+    tamanhos_suspeitos = agrupar_anomalias(anomalias)
+    if not missing_backups and not tamanhos_suspeitos:
+        logging.info("Nenhum backup ausente ou com tamanho suspeito encontrado. Nenhum email enviado.")
         return False
-    html_body = """
-<html>
-  <body>
-    <h2 style="color: red;">Backups Ausentes Detectados</h2>
-"""
-    for key, miss in missing_backups.items():
-        if not miss["semanas"]:
-            continue
-        semanas_str = ", ".join(map(str, sorted(miss["semanas"])))
-        intervalos_str = ", ".join(miss["intervalos"])
-        quantidade = len(miss["semanas"])
-        html_body += f"""
-        <div style="margin-bottom: 15px; padding: 10px; border: 1px solid #ccc; border-radius: 5px;">
-            <p>TAG: <strong>{miss['tag']}</strong></p>
-            <p>Responsável: <strong><span style="color: red;">{miss['responsible']}</span></strong></p>
-            <p>Setor: <strong>{miss['setor']}</strong></p>
-            <p>Semanas: {semanas_str}</p>
-            <p>Quantidade de backups faltantes: <strong><span style="color: red;">{quantidade}</span></strong></p>
-            <p>Intervalos: {intervalos_str}</p>
-        </div>
-    """
-    html_body += """
-  </body>
-</html>
-"""
     if stop_event and stop_event.is_set():
         logging.info("Email interrompido pelo usuário antes do envio.")
         return False
-    msg = MIMEMultipart()
-    msg["From"] = from_email
-    msg["To"] = to_email if isinstance(to_email, str) else ", ".join(to_email)
-    msg["Subject"] = "Relatório de Backups Ausentes"
-    msg.attach(MIMEText(html_body, "html"))
+    return enviar_relatorios(missing_backups, stop_event=stop_event, anomalias=tamanhos_suspeitos)
+
+def main(excel_path=None, send_email=True, stop_event=None, progress_callback=None, progress_channel=None):
+    metricas = iniciar_metricas()
+    diario = DiarioVerificacao(excel_path or EXCEL_PATH)
+    sucesso = False
     try:
-        with smtplib.SMTP(smtp_server, smtp_port, timeout=30) as server:
-            if stop_event and stop_event.is_set():
-                logging.info("Conexão SMTP interrompida pelo usuário.")
-                return False
-            server.starttls()
-            if stop_event and stop_event.is_set():
-                logging.info("Autenticação SMTP interrompida pelo usuário.")
-                return False
-            server.login(smtp_user, smtp_pass)
-            if stop_event and stop_event.is_set():
-                logging.info("Envio de e-mail interrompido pelo usuário antes da entrega.")
-                return False
-            server.sendmail(from_email, to_email if isinstance(to_email, str) else to_email, msg.as_string())
-        logging.info("E-mail ok")
-        return True
-    except smtplib.SMTPServerDisconnected:
-        logging.error("Erro: Servidor SMTP desconectado inesperadamente. Verifique o servidor e a porta.")
-        return False
-    except smtplib.SMTPAuthenticationError:
-        logging.error("Erro: Falha na autenticação. Verifique usuário e senha.")
-        return False
+        sucesso = executar_verificacao(excel_path, send_email, stop_event, progress_callback, metricas, progress_channel, diario)
+        return sucesso
+    finally:
+        if not sucesso:
+            gravar_parcial(excel_path or EXCEL_PATH, diario)
+        diario.fechar()
+        logging.info("Cache de varredura", extra={"campos": obter_cache_varredura().estatisticas()})
+        metricas.exportar(sucesso)
+
+def gravar_parcial(caminho, diario):
+    # Interrupção ou falha: grava o que já foi decidido; o diário fica para a próxima execução retomar
+    pendentes = diario.pendentes()
+    if not pendentes:
+        return
+    try:
+        gravar_alteracoes(caminho, pendentes)
+        logging.info(f"Resultados parciais gravados: {len(pendentes)} célula(s). Diário mantido em {diario.caminho}.")
     except Exception as e:
-        logging.error(f"Erro ao enviar email: {e}")
-        return False
+        logging.error(f"Erro ao gravar resultados parciais em {caminho}: {e}")
 
-def main(excel_path=None, send_email=True, stop_event=None, progress_callback=None):
+def executar_verificacao(
+    excel_path, send_email, stop_event, progress_callback, metricas, progress_channel=None, diario=None
+):
     EXCEL_PATH = excel_path or EXCEL_PATH
     if stop_event and stop_event.is_set():
         logging.info("Verificação interrompida pelo usuário.")
@@ -272,17 +461,18 @@ def main(excel_path=None, send_email=True, stop_event=None, progress_callback=No
     # Adicionar depuração para verificar STORAGE_BASE
     logging.info(f"Verificando caminho remoto: {STORAGE_BASE}")
     try:
-        if os.path.exists(STORAGE_BASE):
+        with metricas.fase("sondagem_storage"):
+            acessivel = os.path.exists(STORAGE_BASE)
+        if acessivel:
             logging.info("Caminho remoto acessível.")
-            dir_contents = os.listdir(STORAGE_BASE)
-            logging.info(f"Conteúdo do diretório {STORAGE_BASE}: {dir_contents}")
+            # Listagem completa só em DEBUG: em shares grandes custa segundos e megabytes de log
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug(f"Conteúdo do diretório {STORAGE_BASE}: {os.listdir(STORAGE_BASE)}")
         else:
             logging.error(f"Caminho remoto {STORAGE_BASE} não existe ou não está acessível.")
             # Tentar listar o diretório pai para depuração
             parent_path = os.path.dirname(STORAGE_BASE) 
-            if os.path.exists(parent_path):
-                logging.info(f"Conteúdo do diretório pai {parent_path}: {os.listdir(parent_path)}")
-            else:
+            if not os.path.exists(parent_path):
                 logging.error(f"Diretório pai {parent_path} também não acessível.")
             raise Exception(f"Storage remoto {STORAGE_BASE} não acessível.")
     except Exception as e:
@@ -299,7 +489,9 @@ def main(excel_path=None, send_email=True, stop_event=None, progress_callback=No
         logging.error(f"Erro: Storage remoto {STORAGE_BASE} não acessível.")
         return False
     try:
-        wb = retry(openpyxl.load_workbook, EXCEL_PATH, stop_event=stop_event)
+        # Análise em modo somente leitura; a planilha só é reaberta para gravar as células alteradas
+        with metricas.fase("carga_planilha"):
+            wb = retry(openpyxl.load_workbook, EXCEL_PATH, read_only=True, stop_event=stop_event)
         logging.info(f"Ano atual: {ANO_ATUAL}, Mês atual: {MES_ATUAL}, Semana atual: {SEMANA_ATUAL}")
         semanas_do_mes = get_month_weeks(ANO_ATUAL, MES_ATUAL)
         logging.info(f"Semanas do mês {MES_ATUAL}/{ANO_ATUAL}: {semanas_do_mes}")
@@ -309,108 +501,103 @@ def main(excel_path=None, send_email=True, stop_event=None, progress_callback=No
         # Contar abas para progresso
         total_sheets = len(wb.sheetnames)
         current_sheet = 0
+        if progress_channel:
+            progress_channel.iniciar(total_sheets)
+
+        pipeline = PipelineVerificacao(
+            stop_event=stop_event, meses_prioritarios=meses_da_semana(datetime.now()), canal=progress_channel, diario=diario
+        )
+        tabelas = {}
+        alteracoes = []
+        resultados = []
+        abas_verificadas = []
+        if diario:
+            diario.abrir()
+            pipeline.precarregar(diario.pastas_concluidas(ArquivoBackup))
 
+        def verificar(aba_pronta):
+            novas = []
+            with metricas.fase("correspondencia"):
+                ok = verificar_aba(aba_pronta, pipeline, semanas_a_verificar, ANO_ATUAL, novas, resultados, stop_event)
+            if ok:
+                alteracoes.extend(novas)
+                abas_verificadas.append(aba_pronta)
+                if diario:
+                    diario.registrar_celulas(novas)
+            return ok
+
+        # Planeja todas as abas primeiro; a varredura corre no agendador enquanto as próximas abas são lidas
         for sheet_name in wb.sheetnames:
             if stop_event and stop_event.is_set():
                 logging.info(f"Verificação interrompida na aba: {sheet_name}")
+                pipeline.cancelar()
                 return False
-            ws = wb[sheet_name]
-            intervalos_por_semana = {}
-            meses_envolvidos = set()
-            for col in range(6, ws.max_column + 1):
-                if stop_event and stop_event.is_set():
-                    logging.info(f"Verificação interrompida ao processar colunas da aba: {sheet_name}")
-                    return False
-                header_value = ws.cell(row=2, column=col).value
-                if header_value is not None:
-                    match = re.search(r"(?:Semana\s*|\s*)(\d+)(?:\s*ª|\s*)", str(header_value), re.IGNORECASE)
-                    if match:
-                        semana_num = int(match.group(1))
-                        if semana_num in semanas_a_verificar:
-                            interval_str = ws.cell(row=3, column=col).value
-                            start_date, end_date = parse_interval(interval_str, ANO_ATUAL, MES_ATUAL)
-                            if start_date and end_date:
-                                intervalos_por_semana[semana_num] = (start_date, end_date)
-                                meses_envolvidos.add(start_date.strftime("%m-%Y"))
-                                meses_envolvidos.add(end_date.strftime("%m-%Y"))
-            todas_as_pastas = []
-            pasta_para_mes = {}
-            for row in range(4, ws.max_row + 1):
-                if stop_event and stop_event.is_set():
-                    logging.info(f"Verificação interrompida ao processar linhas da aba: {sheet_name}")
-                    return False
-                informacao_coluna_A = ws.cell(row=row, column=1).value
-                informacao_coluna_C = ws.cell(row=row, column=3).value
-                if not informacao_coluna_A or not informacao_coluna_C:
-                    continue
-                for mes_ano in meses_envolvidos:
-                    mes, ano = mes_ano.split("-")
-                    caminho_formato = f"{informacao_coluna_C}/{informacao_coluna_A}/{mes_ano}"
-                    caminho_pasta = os.path.join(STORAGE_BASE, ano, *caminho_formato.split("/"))
-                    if caminho_pasta not in todas_as_pastas:
-                        todas_as_pastas.append(caminho_pasta)
-                        pasta_para_mes[caminho_pasta] = mes_ano
-            resultados_busca = buscar_arquivos_em_paralelo([(pasta, pasta_para_mes[pasta]) for pasta in todas_as_pastas], stop_event=stop_event)
-            for row in range(4, ws.max_row + 1):
-                if stop_event and stop_event.is_set():
-                    logging.info(f"Verificação interrompida ao processar linhas da aba: {sheet_name}")
+            with metricas.fase("leitura_cabecalhos"):
+                tabelas[sheet_name] = TabelaPlanilha.from_worksheet(wb[sheet_name], ANO_ATUAL, MES_ATUAL, nome=sheet_name)
+            if diario:
+                diario.aplicar(tabelas[sheet_name], alteracoes)
+            with metricas.fase("planejamento"):
+                aba = planejar_aba(tabelas[sheet_name], semanas_a_verificar, pipeline, stop_event)
+            if aba is None:
+                pipeline.cancelar()
+                return False
+            pipeline.adicionar_aba(aba)
+            for aba_pronta in pipeline.abas_prontas():
+                if not verificar(aba_pronta):
+                    pipeline.cancelar()
                     return False
-                informacao_coluna_A = ws.cell(row=row, column=1).value
-                informacao_coluna_C = ws.cell(row=row, column=3).value
-                if not informacao_coluna_A or not informacao_coluna_C:
-                    continue
-                arquivos_por_semana = defaultdict(list)
-                for mes_ano in meses_envolvidos:
-                    mes, ano = mes_ano.split("-")
-                    caminho_formato = f"{informacao_coluna_C}/{informacao_coluna_A}/{mes_ano}"
-                    caminho_pasta = os.path.join(STORAGE_BASE, ano, *caminho_formato.split("/"))
-                    arquivos = resultados_busca.get(caminho_pasta, [])
-                    for arquivo in arquivos:
-                        try:
-                            data_mod = datetime.fromtimestamp(os.path.getmtime(arquivo)).date()
-                            ano_arquivo = data_mod.year
-                            if ano_arquivo != ANO_ATUAL:
-                                continue
-                            for semana, (data_inicio, data_fim) in intervalos_por_semana.items():
-                                if data_inicio <= data_mod <= data_fim:
-                                    arquivos_por_semana[semana].append((arquivo, data_mod))
-                        except OSError as e:
-                            logging.error(f"Erro ao acessar arquivo {arquivo}: {e}")
-                for semana in semanas_a_verificar:
-                    if stop_event and stop_event.is_set():
-                        logging.info(f"Verificação interrompida ao processar semana {semana} na aba: {sheet_name}")
-                        return False
-                    if semana not in intervalos_por_semana:
-                        continue
-                    coluna = encontrar_coluna_semana(ws, semana)
-                    if coluna is None:
-                        continue
-                    celula = ws.cell(row=row, column=coluna)
-                    if celula.value is not None and celula.value != "NOT FOUND":
-                        continue
-                    archs = arquivos_por_semana.get(semana, [])
-                    if not archs:
-                        caminho_vermelho(celula)
-                        continue
-                    archs.sort(key=lambda x: x[1], reverse=True)
-                    arquivo_mais_recente, data_mod = archs[0]
-                    data_str = data_mod.strftime(DATA_FORMATO)
-                    caminho_verde(data_str, os.path.basename(arquivo_mais_recente), os.path.dirname(arquivo_mais_recente), celula)
-            
-            # Atualizar progresso após cada aba
+                current_sheet += 1
+                if progress_callback:
+                    progress_callback(current_sheet / total_sheets)
+                if progress_channel:
+                    progress_channel.aba_concluida()
+
+        wb.close()
+        prontas = pipeline.abas_prontas(bloquear=True)
+        while True:
+            with metricas.fase("espera_varredura"):
+                aba_pronta = next(prontas, None)
+            if aba_pronta is None:
+                break
+            if not verificar(aba_pronta):
+                pipeline.cancelar()
+                return False
             current_sheet += 1
             if progress_callback:
                 progress_callback(current_sheet / total_sheets)
+            if progress_channel:
+                progress_channel.aba_concluida()
+        if stop_event and stop_event.is_set():
+            logging.info("Verificação interrompida aguardando a varredura do storage.")
+            pipeline.cancelar()
+            return False
 
-        retry(wb.save, EXCEL_PATH, stop_event=stop_event)
+        if alteracoes:
+            with metricas.fase("gravacao"):
+                retry(gravar_alteracoes, EXCEL_PATH, alteracoes, stop_event=stop_event)
+        metricas.contar("celulas_alteradas", len(alteracoes))
+        if diario:
+            diario.concluir()
         logging.info("Dados gravados na planilha com sucesso.")
+        if HISTORICO_RESULTADOS:
+            with metricas.fase("historico"):
+                registrar_resultados(EXCEL_PATH, resultados)
         
         # Forçar 100% ao final
         if progress_callback:
             progress_callback(1.0)
+        if progress_channel:
+            progress_channel.concluir()
         
+        anomalias = []
+        if ANALISE_TAMANHOS:
+            with metricas.fase("analise_tamanhos"):
+                anomalias = analisar_abas(abas_verificadas)
+
         if send_email:
-            if enviar_email_notificacao(wb, stop_event=stop_event):
+            with metricas.fase("email"):
+                enviado = enviar_email_notificacao(resultados, stop_event=stop_event, anomalias=anomalias)
+            if enviado:
                 logging.info("E-mail de notificação enviado com sucesso.")
                 return True
             else:
@@ -0,0 +1,179 @@
+import atexit
+import os
+import sqlite3
+import threading
+import logging
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from storage_settings import (
+    VALIDACAO_DB_PATH,
+    VALIDACAO_HASH,
+    VALIDACAO_PROCESSOS,
+    VALIDACAO_TAMANHO_MINIMO,
+)
+from metricas import obter_metricas
+from storage_indice import obter_indice
+from storage_cache import obter_cache_varredura
+from validacao_formatos import validar_arquivo
+
+# valido: True/False; motivo: por que o arquivo foi recusado; hash: SHA-256 quando VALIDACAO_HASH
+ResultadoValidacao = namedtuple("ResultadoValidacao", ["valido", "motivo", "hash"])
+
+_cache = None
+_cache_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+class CacheValidacao:
+    def __init__(self, caminho_db=VALIDACAO_DB_PATH):
+        self.caminho_db = caminho_db
+        self.lock = threading.Lock()
+        try:
+            self.conn = sqlite3.connect(caminho_db, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.Error as e:
+            logging.error(f"Erro ao abrir o cache de validação {caminho_db}, usando cache em memória: {e}")
+            self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS validacoes (
+                caminho TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                valido INTEGER NOT NULL,
+                motivo TEXT,
+                hash TEXT,
+                validado_em REAL NOT NULL,
+                PRIMARY KEY (caminho, tamanho, mtime)
+            )
+            """
+        )
+        self.conn.commit()
+
+    def obter(self, arquivo):
+        with self.lock:
+            linha = self.conn.execute(
+                "SELECT valido, motivo, hash FROM validacoes WHERE caminho = ? AND tamanho = ? AND mtime = ?",
+                (arquivo.caminho, arquivo.tamanho, arquivo.mtime),
+            ).fetchone()
+        if linha is None:
+            return None
+        return ResultadoValidacao(bool(linha[0]), linha[1], linha[2])
+
+    def guardar(self, validados):
+        # validados: [(ArquivoBackup, ResultadoValidacao)]; versões anteriores do mesmo caminho saem do cache
+        with self.lock, self.conn:
+            for arquivo, resultado in validados:
+                self.conn.execute("DELETE FROM validacoes WHERE caminho = ?", (arquivo.caminho,))
+                self.conn.execute(
+                    "INSERT INTO validacoes (caminho, tamanho, mtime, valido, motivo, hash, validado_em) "
+                    "VALUES (?, ?, ?, ?, ?, ?, strftime('%s', 'now'))",
+                    (arquivo.caminho, arquivo.tamanho, arquivo.mtime, int(resultado.valido), resultado.motivo, resultado.hash),
+                )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def obter_cache_validacao():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheValidacao()
+            logging.info(f"Cache de validação de backups aberto em: {_cache.caminho_db}")
+        return _cache
+
+def _obter_pool():
+    # Um único pool por processo: criar processos a cada aba custaria mais que a validação em cache
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=VALIDACAO_PROCESSOS)
+            atexit.register(encerrar_pool)
+        return _pool
+
+def encerrar_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+def mudou_desde_a_listagem(arquivo):
+    # Recusas em cache são conferidas com um stat: uma cópia concluída no lugar não muda o mtime da pasta,
+    # então o índice continua com o tamanho/mtime da cópia parcial
+    try:
+        stat = os.stat(arquivo.caminho)
+    except OSError:
+        return False
+    return (stat.st_size, stat.st_mtime) != (arquivo.tamanho, arquivo.mtime)
+
+def atualizar_listagem(arquivo, tamanho, mtime):
+    pasta = os.path.dirname(arquivo.caminho)
+    obter_indice().atualizar_entrada(pasta, arquivo.nome, mtime, tamanho)
+    # Listagens em cache da pasta MM-YYYY que contém o arquivo também estão desatualizadas
+    obter_cache_varredura().invalidar_ancestrais(pasta)
+    logging.info(
+        f"Índice desatualizado para {arquivo.caminho}: {arquivo.tamanho} -> {tamanho} bytes; entrada atualizada."
+    )
+
+def validar_backups(arquivos, calcular_hash=VALIDACAO_HASH, stop_event=None):
+    # Devolve {caminho: ResultadoValidacao}; arquivos ilegíveis ficam de fora e não são cacheados
+    metricas = obter_metricas()
+    cache = obter_cache_validacao()
+    resultados = {}
+    pendentes = {}
+    for arquivo in arquivos:
+        if arquivo.caminho in resultados or arquivo.caminho in pendentes:
+            continue
+        resultado = cache.obter(arquivo)
+        if resultado is not None and not resultado.valido and mudou_desde_a_listagem(arquivo):
+            resultado = None
+        if resultado is not None and (resultado.hash is not None or not calcular_hash or not resultado.valido):
+            resultados[arquivo.caminho] = resultado
+        else:
+            pendentes[arquivo.caminho] = arquivo
+    metricas.contar("validacoes_do_cache", len(resultados))
+    if not pendentes:
+        return resultados
+
+    logging.info(f"Validando {len(pendentes)} backup(s) em {VALIDACAO_PROCESSOS} processo(s)...")
+    with metricas.fase("validacao_backups"):
+        pool = _obter_pool()
+        futures = {
+            pool.submit(validar_arquivo, caminho, VALIDACAO_TAMANHO_MINIMO, calcular_hash): arquivo
+            for caminho, arquivo in pendentes.items()
+        }
+        validados = []
+        lidos = 0
+        for future in as_completed(futures):
+            if stop_event and stop_event.is_set():
+                for f in futures:
+                    f.cancel()
+                logging.info("Validação de backups interrompida pelo usuário.")
+                break
+            arquivo = futures[future]
+            try:
+                valido, motivo, hash_arquivo, tamanho, mtime = future.result()
+            except Exception as e:
+                logging.error(f"Erro ao validar {arquivo.caminho}: {e}")
+                continue
+            if valido is None:
+                logging.warning(f"Não foi possível ler {arquivo.caminho} para validação: {motivo}")
+                continue
+            lidos += 1
+            resultado = ResultadoValidacao(valido, motivo, hash_arquivo)
+            if not valido:
+                logging.warning(f"Backup corrompido: {arquivo.caminho} ({motivo})")
+                metricas.contar("backups_corrompidos")
+            resultados[arquivo.caminho] = resultado
+            if (tamanho, mtime) == (arquivo.tamanho, arquivo.mtime):
+                # Chave do cache = tamanho/mtime do arquivo lido, que aqui coincidem com o índice
+                validados.append((arquivo, resultado))
+            else:
+                # O arquivo lido não é o que o índice registrou: corrige o índice e não cacheia este resultado
+                atualizar_listagem(arquivo, tamanho, mtime)
+        cache.guardar(validados)
+    metricas.contar("backups_validados", lidos)
+    return resultados
@@ -0,0 +1,159 @@
+import os
+import mmap
+import struct
+import zlib
+import hashlib
+
+# Funções puras executadas nos processos de validação: não importam storage_settings,
+# para que cada processo filho não reconfigure o log ao ser criado
+
+ASSINATURA_ZIP = b"PK\x03\x04"
+ZIP_EOCD = b"PK\x05\x06"
+ZIP_CENTRAL = b"PK\x01\x02"
+ZIP64_LOCALIZADOR = b"PK\x06\x07"
+ZIP64_EOCD = b"PK\x06\x06"
+ZIP_MAX_COMENTARIO = 65535
+
+ASSINATURA_RAR4 = b"Rar!\x1a\x07\x00"
+ASSINATURA_RAR5 = b"Rar!\x1a\x07\x01\x00"
+RAR_BUSCA_SFX = 1024 * 1024  # executáveis autoextraíveis trazem o stub antes da assinatura
+RAR_BUSCA_FIM = 64  # bytes do final onde o bloco de fim de arquivo é procurado
+RAR4_BLOCO_FIM = 0x7B
+RAR4_CABECALHO_PRINCIPAL = 0x73
+RAR4_SENHA_CABECALHOS = 0x0080
+RAR5_BLOCO_FIM = 5
+RAR5_CABECALHO_CRIPTOGRAFIA = 4
+
+BLOCO_HASH = 8 * 1024 * 1024
+
+def validar_zip(mm):
+    tamanho = len(mm)
+    pos = mm.rfind(ZIP_EOCD, max(0, tamanho - 22 - ZIP_MAX_COMENTARIO))
+    if pos < 0 or pos + 22 > tamanho:
+        return "fim do diretório central (EOCD) não encontrado"
+    _, disco, _, _, entradas, tamanho_cd, offset_cd, _ = struct.unpack_from("<IHHHHIIH", mm, pos)
+    fim_cd = pos
+    if entradas == 0xFFFF or tamanho_cd == 0xFFFFFFFF or offset_cd == 0xFFFFFFFF:
+        localizador = pos - 20
+        if localizador < 0 or mm[localizador:localizador + 4] != ZIP64_LOCALIZADOR:
+            return "localizador ZIP64 não encontrado"
+        fim_cd = struct.unpack_from("<Q", mm, localizador + 8)[0]
+        if fim_cd + 56 > localizador or mm[fim_cd:fim_cd + 4] != ZIP64_EOCD:
+            return "registro ZIP64 do fim do diretório central inválido"
+        entradas, tamanho_cd, offset_cd = struct.unpack_from("<QQQ", mm, fim_cd + 32)
+    if disco != 0:
+        return None  # ZIP em volumes: o diretório central fica no último volume
+    if offset_cd + tamanho_cd > fim_cd:
+        return "diretório central fora do arquivo (arquivo truncado)"
+
+    # Percorre o diretório central e confere o cabeçalho local da última entrada gravada
+    p = offset_cd
+    ultimo_local, ultimo_comprimido = -1, 0
+    for i in range(entradas):
+        if p + 46 > fim_cd or mm[p:p + 4] != ZIP_CENTRAL:
+            return f"entrada {i} do diretório central inválida"
+        comprimido = struct.unpack_from("<I", mm, p + 20)[0]
+        nome, extra, comentario = struct.unpack_from("<HHH", mm, p + 28)
+        offset_local = struct.unpack_from("<I", mm, p + 42)[0]
+        if offset_local != 0xFFFFFFFF and offset_local > ultimo_local:
+            ultimo_local = offset_local
+            ultimo_comprimido = comprimido if comprimido != 0xFFFFFFFF else 0
+        p += 46 + nome + extra + comentario
+    if p > fim_cd:
+        return "diretório central truncado"
+    if ultimo_local >= 0:
+        if mm[ultimo_local:ultimo_local + 4] != ASSINATURA_ZIP:
+            return "cabeçalho local da última entrada não encontrado"
+        nome, extra = struct.unpack_from("<HH", mm, ultimo_local + 26)
+        if ultimo_local + 30 + nome + extra + ultimo_comprimido > offset_cd:
+            return "dados da última entrada ultrapassam o diretório central (arquivo truncado)"
+    return None
+
+def _ler_vint(mm, p):
+    valor, deslocamento = 0, 0
+    while p < len(mm):
+        byte = mm[p]
+        valor |= (byte & 0x7F) << deslocamento
+        p += 1
+        if not byte & 0x80:
+            return valor, p
+        deslocamento += 7
+    return None, p
+
+def _fim_rar5(mm, inicio):
+    # Bloco de fim: CRC32 | tamanho (vint) | tipo 5 | flags | flags de fim, terminando no último byte
+    tamanho = len(mm)
+    for p in range(tamanho - 3, max(inicio, tamanho - RAR_BUSCA_FIM) - 1, -1):
+        if p < 4 or p + 1 + mm[p] != tamanho or mm[p + 1] != RAR5_BLOCO_FIM:
+            continue
+        if zlib.crc32(mm[p:tamanho]) == struct.unpack_from("<I", mm, p - 4)[0]:
+            return True
+    return False
+
+def _fim_rar4(mm, inicio):
+    # Bloco de fim: HEAD_CRC | HEAD_TYPE 0x7B | HEAD_FLAGS | HEAD_SIZE, terminando no último byte
+    tamanho = len(mm)
+    for p in range(tamanho - 7, max(inicio, tamanho - RAR_BUSCA_FIM) - 1, -1):
+        if mm[p + 2] != RAR4_BLOCO_FIM:
+            continue
+        tamanho_bloco = struct.unpack_from("<H", mm, p + 5)[0]
+        if tamanho_bloco < 7 or p + tamanho_bloco != tamanho:
+            continue
+        if zlib.crc32(mm[p + 2:tamanho]) & 0xFFFF == struct.unpack_from("<H", mm, p)[0]:
+            return True
+    return False
+
+def validar_rar(mm):
+    pos = mm.find(ASSINATURA_RAR5, 0, RAR_BUSCA_SFX)
+    if pos >= 0:
+        inicio = pos + len(ASSINATURA_RAR5)
+        _, p = _ler_vint(mm, inicio + 4)
+        tipo, _ = _ler_vint(mm, p)
+        if tipo is None:
+            return "cabeçalho RAR5 truncado"
+        if tipo == RAR5_CABECALHO_CRIPTOGRAFIA:
+            return None  # cabeçalhos criptografados (-hp): o bloco de fim não é legível sem a senha
+        return None if _fim_rar5(mm, inicio) else "bloco de fim do RAR5 ausente (arquivo truncado)"
+    pos = mm.find(ASSINATURA_RAR4, 0, RAR_BUSCA_SFX)
+    if pos >= 0:
+        inicio = pos + len(ASSINATURA_RAR4)
+        if inicio + 5 > len(mm) or mm[inicio + 2] != RAR4_CABECALHO_PRINCIPAL:
+            return "cabeçalho principal do RAR ausente"
+        if struct.unpack_from("<H", mm, inicio + 3)[0] & RAR4_SENHA_CABECALHOS:
+            return None
+        return None if _fim_rar4(mm, inicio) else "bloco de fim do RAR ausente (arquivo truncado)"
+    return "assinatura RAR não encontrada"
+
+def hash_conteudo(mm):
+    h = hashlib.sha256()
+    for inicio in range(0, len(mm), BLOCO_HASH):
+        h.update(mm[inicio:inicio + BLOCO_HASH])
+    return h.hexdigest()
+
+def validar_arquivo(caminho, tamanho_minimo, calcular_hash=False):
+    # Devolve (válido, motivo, hash, tamanho, mtime) do arquivo efetivamente lido (fstat);
+    # válido None quando o arquivo não pôde ser lido (não é cacheado)
+    try:
+        with open(caminho, "rb") as f:
+            stat = os.fstat(f.fileno())
+            tamanho, mtime = stat.st_size, stat.st_mtime
+            if tamanho == 0:
+                return False, "arquivo vazio (0 bytes)", None, tamanho, mtime
+            if tamanho < tamanho_minimo:
+                return False, f"arquivo muito pequeno ({tamanho} bytes)", None, tamanho, mtime
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                extensao = os.path.splitext(caminho)[1].lower()
+                try:
+                    if extensao == ".rar":
+                        motivo = validar_rar(mm)
+                    elif extensao == ".zip" or mm[:4] == ASSINATURA_ZIP:
+                        motivo = validar_zip(mm)
+                    else:
+                        motivo = None  # formato próprio (.lscx): só a verificação de tamanho
+                except struct.error:
+                    motivo = "estrutura interna inválida (arquivo truncado)"
+                if motivo is None and calcular_hash:
+                    return True, None, hash_conteudo(mm), tamanho, mtime
+                return motivo is None, motivo, None, tamanho, mtime
+    except (OSError, ValueError) as e:
+        return None, str(e), None, None, None
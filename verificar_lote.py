@@ -0,0 +1,154 @@
+import argparse
+import glob
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import openpyxl
+from storage_settings import EXCEL_PATH, MAX_PLANILHAS_PARALELAS, HISTORICO_RESULTADOS, ANALISE_TAMANHOS
+from metricas import iniciar_metricas
+from planilha_layout import TabelaPlanilha
+from planilha_escrita import gravar_alteracoes
+from historico_resultados import registrar_resultados
+from analise_tamanhos import analisar_abas
+import storage_verificar
+from storage_verificar import (
+    PipelineVerificacao,
+    enviar_email_notificacao,
+    get_month_weeks,
+    meses_da_semana,
+    planejar_aba,
+    retry,
+    verificar_aba,
+)
+
+def expandir_planilhas(padroes):
+    caminhos = []
+    for padrao in padroes:
+        encontrados = sorted(glob.glob(padrao)) if glob.has_magic(padrao) else [padrao]
+        for caminho in encontrados:
+            nome = os.path.basename(caminho)
+            # "~$..." são arquivos de bloqueio do Excel aberto
+            if nome.startswith("~$") or not nome.lower().endswith(".xlsx"):
+                continue
+            caminho = os.path.abspath(caminho)
+            if caminho not in caminhos:
+                caminhos.append(caminho)
+    return caminhos
+
+def planejar_planilha(caminho, pipeline, semanas_a_verificar, agora, stop_event=None):
+    # Cada planilha só acrescenta ao pipeline as pastas que nenhuma outra já pediu
+    wb = retry(openpyxl.load_workbook, caminho, read_only=True, stop_event=stop_event)
+    try:
+        abas = []
+        for sheet_name in wb.sheetnames:
+            tabela = TabelaPlanilha.from_worksheet(wb[sheet_name], agora.year, agora.month, nome=sheet_name)
+            aba = planejar_aba(tabela, semanas_a_verificar, pipeline, stop_event)
+            if aba is None:
+                return None
+            abas.append(aba)
+        return abas
+    finally:
+        wb.close()
+
+def preencher_planilha(caminho, abas, pipeline, semanas_a_verificar, agora, stop_event=None):
+    alteracoes = []
+    resultados = []
+    for aba in abas:
+        if not verificar_aba(aba, pipeline, semanas_a_verificar, agora.year, alteracoes, resultados, stop_event):
+            return None
+    if alteracoes:
+        retry(gravar_alteracoes, caminho, alteracoes, stop_event=stop_event)
+    logging.info(f"Planilha {caminho}: {len(alteracoes)} célula(s) gravada(s).")
+    if HISTORICO_RESULTADOS:
+        registrar_resultados(caminho, resultados)
+    # No relatório consolidado a aba vem prefixada pela planilha
+    return [resultado._replace(aba=aba_consolidada(caminho, resultado.aba)) for resultado in resultados]
+
+def aba_consolidada(caminho, aba):
+    return f"{os.path.splitext(os.path.basename(caminho))[0]} - {aba}"
+
+def processar_planilha(caminho, pipeline, semanas_a_verificar, agora, stop_event=None):
+    # (resultados, abas) com os nomes das abas já prefixados pela planilha, ou None em caso de falha
+    try:
+        abas = planejar_planilha(caminho, pipeline, semanas_a_verificar, agora, stop_event)
+        if abas is None:
+            return None
+        resultados = preencher_planilha(caminho, abas, pipeline, semanas_a_verificar, agora, stop_event)
+        if resultados is None:
+            return None
+        return resultados, [aba._replace(nome=aba_consolidada(caminho, aba.nome)) for aba in abas]
+    except Exception as e:
+        logging.error(f"Erro ao processar a planilha {caminho}: {e}", exc_info=True)
+        return None
+
+def verificar_lote(caminhos, send_email=True, stop_event=None):
+    metricas = iniciar_metricas()
+    sucesso = False
+    try:
+        sucesso = _verificar_lote(caminhos, send_email, stop_event, metricas)
+        return sucesso
+    finally:
+        metricas.exportar(sucesso)
+
+def _verificar_lote(caminhos, send_email, stop_event, metricas):
+    if not caminhos:
+        logging.error("Nenhuma planilha encontrada para a verificação em lote.")
+        return False
+    faltando = [caminho for caminho in caminhos if not os.path.exists(caminho)]
+    if faltando:
+        logging.error(f"Erro: planilha(s) não encontrada(s): {faltando}")
+        return False
+    with metricas.fase("sondagem_storage"):
+        acessivel = retry(os.path.exists, storage_verificar.STORAGE_BASE, stop_event=stop_event)
+    if not acessivel:
+        logging.error(f"Erro: Storage remoto {storage_verificar.STORAGE_BASE} não acessível.")
+        return False
+
+    agora = datetime.now()
+    semana_atual = agora.isocalendar()[1]
+    semanas_a_verificar = [semana for semana in get_month_weeks(agora.year, agora.month) if semana <= semana_atual]
+    logging.info(f"Verificação em lote de {len(caminhos)} planilha(s), semanas {semanas_a_verificar}: {caminhos}")
+
+    # Um único pipeline: a mesma pasta <tag>/<MM-YYYY> é varrida uma vez para todas as planilhas
+    pipeline = PipelineVerificacao(stop_event=stop_event, meses_prioritarios=meses_da_semana(agora))
+    with metricas.fase("planilhas"):
+        with ThreadPoolExecutor(max_workers=min(MAX_PLANILHAS_PARALELAS, len(caminhos))) as executor:
+            futuros = [
+                executor.submit(processar_planilha, caminho, pipeline, semanas_a_verificar, agora, stop_event)
+                for caminho in caminhos
+            ]
+            por_planilha = [futuro.result() for futuro in futuros]
+    if stop_event and stop_event.is_set():
+        logging.info("Verificação em lote interrompida pelo usuário.")
+        pipeline.cancelar()
+        return False
+    resultados = [resultado for processada in por_planilha if processada for resultado in processada[0]]
+    abas = [aba for processada in por_planilha if processada for aba in processada[1]]
+    falhas = [caminho for caminho, processada in zip(caminhos, por_planilha) if processada is None]
+    if falhas:
+        logging.error(f"Falha na verificação das planilhas: {falhas}")
+
+    # Uma única análise de tamanhos para as TAGs de todas as planilhas
+    anomalias = []
+    if ANALISE_TAMANHOS:
+        with metricas.fase("analise_tamanhos"):
+            anomalias = analisar_abas(abas)
+
+    if send_email:
+        with metricas.fase("email"):
+            enviado = enviar_email_notificacao(resultados, stop_event=stop_event, anomalias=anomalias)
+        if enviado:
+            logging.info("E-mail consolidado enviado com sucesso.")
+    return not falhas
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Verifica várias planilhas de acompanhamento com uma única varredura do storage."
+    )
+    parser.add_argument("planilhas", nargs="*", help="arquivos .xlsx ou padrões glob (ex.: \"excel/*.xlsx\")")
+    parser.add_argument("--sem-email", action="store_true", help="não envia o relatório consolidado")
+    args = parser.parse_args()
+    caminhos = expandir_planilhas(args.planilhas or [EXCEL_PATH])
+    sys.exit(0 if verificar_lote(caminhos, send_email=not args.sem_email) else 1)
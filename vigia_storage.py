@@ -0,0 +1,292 @@
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+from storage_settings import (
+    DATA_FORMATO,
+    MAX_PROFUNDIDADE,
+    VIGIA_INTERVALO,
+    VIGIA_USAR_NOTIFICACOES,
+    VALIDAR_BACKUPS,
+)
+from storage_indice import obter_indice
+from storage_cache import obter_cache_varredura
+from storage_agendador import share_do_caminho
+from correspondencia_semanas import mais_recente_por_semana
+from planilha_layout import AlteracaoCelula, STATUS_OK, STATUS_REVERIFICAVEIS
+from planilha_escrita import gravar_alteracoes
+import storage_verificar
+from storage_verificar import (
+    PipelineVerificacao,
+    get_month_weeks,
+    listar_subpastas,
+    meses_da_semana,
+    normalizar_nome,
+    retry,
+    varrer_tag,
+)
+from verificar_lote import planejar_planilha, preencher_planilha
+from validacao_backup import validar_backups
+
+try:
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+def mtimes_subarvore(raiz, profundidade=MAX_PROFUNDIDADE):
+    # {pasta: mtime} da pasta e subpastas, montado a partir do índice (um stat por pasta)
+    try:
+        mtimes = {raiz: os.stat(raiz).st_mtime}
+    except FileNotFoundError:
+        return {}
+    indice = obter_indice()
+    pendentes = [(raiz, 0)]
+    while pendentes:
+        pasta, nivel = pendentes.pop()
+        for entrada in indice.listar(pasta) or []:
+            if entrada.is_dir and nivel < profundidade:
+                subpasta = os.path.join(pasta, entrada.nome)
+                mtimes[subpasta] = entrada.mtime
+                pendentes.append((subpasta, nivel + 1))
+    return mtimes
+
+def mudou(mtimes):
+    for pasta, mtime in mtimes.items():
+        try:
+            if os.stat(pasta).st_mtime != mtime:
+                return True
+        except OSError:
+            # Pasta removida ou share instável: revarre a pasta em vez de perder um backup novo
+            return True
+    return False
+
+class NotificadorMudancas:
+    # Handler do watchdog: só marca os caminhos_tag afetados; o trabalho fica com o laço do vigia
+    def __init__(self, vigia):
+        self.vigia = vigia
+
+    def dispatch(self, evento):
+        caminho = getattr(evento, "src_path", "")
+        destino = getattr(evento, "dest_path", "")
+        self.vigia.marcar_alterado(caminho)
+        if destino:
+            self.vigia.marcar_alterado(destino)
+
+class VigiaStorage:
+    def __init__(self, caminhos_planilha, intervalo=VIGIA_INTERVALO, stop_event=None):
+        self.caminhos_planilha = list(caminhos_planilha)
+        self.intervalo = intervalo
+        self.stop_event = stop_event or threading.Event()
+        self.acordar = threading.Event()
+        self.lock = threading.Lock()
+        self.observer = None
+        self.dia = None
+        self.abas = {}  # planilha -> [AbaPlanejada]
+        self.mtime_planilhas = {}
+        self.arquivos = {}  # (caminho_tag, mes_ano) -> [ArquivoBackup]
+        self.mtimes = {}  # (caminho_tag, mes_ano) -> {pasta: mtime}
+        self.chaves_por_tag = defaultdict(set)  # caminho_tag -> {(caminho_tag, mes_ano)}
+        self.linhas_por_chave = defaultdict(set)  # (caminho_tag, mes_ano) -> {(planilha, aba, linha)}
+        self.alterados = set()  # caminhos_tag marcados pelas notificações
+
+    def carregar(self):
+        # Verificação completa (como a diária) mantendo em memória planilhas, pastas e arquivos
+        agora = datetime.now()
+        self.semanas_a_verificar = [
+            semana for semana in get_month_weeks(agora.year, agora.month) if semana <= agora.isocalendar()[1]
+        ]
+        pipeline = PipelineVerificacao(stop_event=self.stop_event, meses_prioritarios=meses_da_semana(agora))
+        self.abas.clear()
+        self.arquivos.clear()
+        self.mtimes.clear()
+        self.chaves_por_tag.clear()
+        self.linhas_por_chave.clear()
+        for caminho in self.caminhos_planilha:
+            try:
+                abas = planejar_planilha(caminho, pipeline, self.semanas_a_verificar, agora, self.stop_event)
+                if abas is None or preencher_planilha(caminho, abas, pipeline, self.semanas_a_verificar, agora, self.stop_event) is None:
+                    return False
+            except Exception as e:
+                logging.error(f"Vigia: erro ao carregar a planilha {caminho}: {e}", exc_info=True)
+                return False
+            self.abas[caminho] = abas
+            self.mtime_planilhas[caminho] = os.stat(caminho).st_mtime
+            for aba in abas:
+                for linha in aba.layout.linhas:
+                    for mes_ano in aba.meses_envolvidos:
+                        caminho_tag = aba.pastas_tag.get((mes_ano.split("-")[1], linha.setor, linha.tag))
+                        if caminho_tag is None:
+                            continue
+                        chave = (caminho_tag, mes_ano)
+                        self.chaves_por_tag[caminho_tag].add(chave)
+                        self.linhas_por_chave[chave].add((caminho, aba.nome, linha.linha))
+        for chave in self.linhas_por_chave:
+            self.arquivos[chave] = pipeline.arquivos(*chave)
+            self.mtimes[chave] = self.instantaneo(*chave)
+        self.dia = agora.date()
+        logging.info(
+            f"Vigia: {len(self.caminhos_planilha)} planilha(s) carregada(s), {len(self.linhas_por_chave)} pasta(s) monitorada(s)."
+        )
+        return True
+
+    def instantaneo(self, caminho_tag, mes_ano):
+        # Pasta da TAG (criação da pasta do mês) + subárvore da pasta MM-YYYY
+        mtimes = mtimes_subarvore(caminho_tag, profundidade=0)
+        subpastas = listar_subpastas(caminho_tag) or {}
+        nome_mes = subpastas.get(normalizar_nome(mes_ano))
+        if nome_mes is not None:
+            mtimes.update(mtimes_subarvore(os.path.join(caminho_tag, nome_mes)))
+        return mtimes
+
+    def marcar_alterado(self, caminho):
+        pasta = caminho
+        for _ in range(MAX_PROFUNDIDADE + 3):
+            if pasta in self.chaves_por_tag:
+                with self.lock:
+                    self.alterados.add(pasta)
+                self.acordar.set()
+                return
+            pai = os.path.dirname(pasta)
+            if pai == pasta:
+                return
+            pasta = pai
+
+    def devolver(self, chaves):
+        # Pastas de um ciclo que falhou voltam para a fila e são revarridas no próximo
+        with self.lock:
+            self.alterados.update(caminho_tag for caminho_tag, _ in chaves)
+
+    def detectar(self, varredura_completa):
+        with self.lock:
+            alterados, self.alterados = self.alterados, set()
+        chaves = {chave for caminho_tag in alterados for chave in self.chaves_por_tag.get(caminho_tag, ())}
+        if varredura_completa:
+            chaves.update(chave for chave, mtimes in self.mtimes.items() if chave not in chaves and mudou(mtimes))
+        return chaves
+
+    def reprocessar(self, chaves):
+        afetadas = defaultdict(set)  # (planilha, aba) -> {linha}
+        for caminho_tag, mes_ano in chaves:
+            obter_cache_varredura().invalidar(caminho_tag)
+            self.arquivos[(caminho_tag, mes_ano)] = varrer_tag(caminho_tag, {mes_ano}, self.stop_event).get(mes_ano, [])
+            self.mtimes[(caminho_tag, mes_ano)] = self.instantaneo(caminho_tag, mes_ano)
+            for planilha, aba, linha in self.linhas_por_chave[(caminho_tag, mes_ano)]:
+                afetadas[(planilha, aba)].add(linha)
+        por_planilha = defaultdict(list)
+        for (planilha, nome_aba), linhas in afetadas.items():
+            aba = next(aba for aba in self.abas[planilha] if aba.nome == nome_aba)
+            por_planilha[planilha].extend(self.reverificar_linhas(aba, linhas))
+        for planilha, alteracoes in por_planilha.items():
+            if not alteracoes:
+                continue
+            retry(gravar_alteracoes, planilha, alteracoes, stop_event=self.stop_event)
+            # A tabela em memória só muda depois da gravação: se ela falhar, as células são tentadas de novo
+            tabelas = {aba.nome: aba.tabela for aba in self.abas[planilha]}
+            for alteracao in alteracoes:
+                tabelas[alteracao.aba].definir(alteracao.linha, alteracao.coluna, alteracao.valor)
+            self.mtime_planilhas[planilha] = os.stat(planilha).st_mtime
+            logging.info(f"Vigia: {len(alteracoes)} célula(s) atualizada(s) em {planilha}.")
+
+    def reverificar_linhas(self, aba, numeros_linha):
+        # Só preenche células vazias, NOT FOUND ou CORROMPIDO que agora têm arquivo válido;
+        # não marca ausências nem corrupção fora do job diário (a cópia pode ainda estar em andamento)
+        tabela = aba.tabela
+        linhas = [linha for linha in aba.layout.linhas if linha.linha in numeros_linha]
+        arquivos_por_linha = {}
+        for linha in linhas:
+            arquivos = []
+            for mes_ano in aba.meses_envolvidos:
+                caminho_tag = aba.pastas_tag.get((mes_ano.split("-")[1], linha.setor, linha.tag))
+                if caminho_tag is not None:
+                    arquivos.extend(self.arquivos.get((caminho_tag, mes_ano), []))
+            arquivos_por_linha[linha.linha] = arquivos
+        mais_recentes = mais_recente_por_semana(arquivos_por_linha, aba.intervalos_por_semana, ano=self.dia.year)
+        validacoes = validar_backups(mais_recentes.values(), stop_event=self.stop_event) if VALIDAR_BACKUPS else {}
+        alteracoes = []
+        for linha in linhas:
+            for semana in self.semanas_a_verificar:
+                coluna = aba.layout.coluna_por_semana.get(semana)
+                arquivo = mais_recentes.get((linha.linha, semana))
+                if coluna is None or arquivo is None:
+                    continue
+                valor_atual = tabela.valor(linha.linha, coluna)
+                if valor_atual is not None and valor_atual not in STATUS_REVERIFICAVEIS:
+                    continue
+                validacao = validacoes.get(arquivo.caminho)
+                if validacao is not None and not validacao.valido:
+                    continue
+                data_str = datetime.fromtimestamp(arquivo.mtime).strftime(DATA_FORMATO)
+                alteracoes.append(AlteracaoCelula(aba.nome, linha.linha, coluna, data_str, STATUS_OK))
+                logging.info(f"Vigia: backup novo para {linha.tag} na semana {semana}: {arquivo.nome}")
+        return alteracoes
+
+    def precisa_recarregar(self):
+        if datetime.now().date() != self.dia:
+            return True
+        for caminho, mtime in self.mtime_planilhas.items():
+            try:
+                if os.stat(caminho).st_mtime != mtime:
+                    logging.info(f"Vigia: planilha alterada externamente, recarregando: {caminho}")
+                    return True
+            except OSError as e:
+                logging.warning(f"Vigia: não foi possível consultar a planilha {caminho}, recarregando: {e}")
+                return True
+        return False
+
+    def iniciar_notificacoes(self):
+        base = storage_verificar.STORAGE_BASE
+        if Observer is None or not VIGIA_USAR_NOTIFICACOES or share_do_caminho(base) != "local":
+            logging.info(f"Vigia: monitorando por mtime das pastas a cada {self.intervalo}s.")
+            return
+        try:
+            self.observer = Observer()
+            self.observer.schedule(NotificadorMudancas(self), base, recursive=True)
+            self.observer.start()
+            logging.info(f"Vigia: usando notificações do sistema de arquivos em {base}.")
+        except Exception as e:
+            logging.warning(f"Vigia: notificações indisponíveis, usando apenas mtime: {e}")
+            self.observer = None
+
+    def ciclo(self):
+        if self.dia is None or self.precisa_recarregar():
+            # dia só volta a valer quando a carga termina; uma carga interrompida é refeita no próximo ciclo
+            self.dia = None
+            if not self.carregar():
+                logging.error("Vigia: falha ao carregar as planilhas, nova tentativa no próximo ciclo.")
+            return
+        acordado = self.acordar.is_set()
+        self.acordar.clear()
+        # Acordado por notificação: só as TAGs marcadas; no intervalo: checa o mtime de todas as pastas
+        chaves = self.detectar(varredura_completa=not acordado)
+        if not chaves:
+            return
+        try:
+            self.reprocessar(chaves)
+        except Exception:
+            self.devolver(chaves)
+            raise
+
+    def executar(self):
+        self.iniciar_notificacoes()
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    self.ciclo()
+                except InterruptedError:
+                    break
+                except Exception as e:
+                    # Uma falha transitória (planilha aberta no Excel, share fora do ar) não encerra o vigia
+                    logging.error(f"Vigia: erro no ciclo, nova tentativa no próximo: {e}", exc_info=True)
+                self.acordar.wait(self.intervalo)
+                if self.stop_event.is_set():
+                    break
+        finally:
+            if self.observer is not None:
+                self.observer.stop()
+                self.observer.join()
+        logging.info("Vigia encerrado.")
+
+    def parar(self):
+        self.stop_event.set()
+        self.acordar.set()